@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True, scope='session')
+def isolated_settings():
+    from core.runner import isolated_settings
+    with isolated_settings():
+        yield
@@ -0,0 +1,140 @@
+"""
+Поля ответов API и сборка JSON прямо из строк .values().
+
+Ключ словаря — имя поля в ответе и в ?fields=, значение — колонка для
+.values(). Запрашиваются только колонки выбранных полей и ключа курсора.
+"""
+from posts import counters, thumbnails
+from posts.models import Post
+
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'updated_at': 'updated_at',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'comments_count': 'comments_count',
+    'image': 'image',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+}
+GROUP_COLUMNS = ('id', 'title', 'slug', 'description')
+USER_COLUMNS = ('id', 'username', 'first_name', 'last_name')
+COUNTERS = ('posts_count', 'followers_count', 'following_count')
+# Числа вне BIGINT база отвергает с OverflowError.
+BIGINT_RANGE = range(-2 ** 63, 2 ** 63)
+# Колонки, без которых не построить курсор.
+CURSOR_COLUMNS = ('id', 'pub_date')
+
+
+class QueryError(ValueError):
+    """Неверные параметры запроса: ответ 400 с текстом ошибки."""
+
+
+class FieldsError(QueryError):
+    pass
+
+
+def parse_fields(request, available):
+    """Поля из ?fields=a,b или все доступные."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(available)
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise FieldsError(
+            f'Неизвестные поля: {", ".join(unknown)}. '
+            f'Доступны: {", ".join(available)}'
+        )
+    return fields
+
+
+def parse_list(request, name, convert=str):
+    """Значения из ?name=a,b без повторов, приведенные через convert."""
+    raw = request.GET.get(name, '')
+    try:
+        result = list(dict.fromkeys(
+            convert(value.strip()) for value in raw.split(',')
+            if value.strip()
+        ))
+    except ValueError:
+        raise QueryError(f'Неверный список в {name}: {raw}')
+    if any(
+        isinstance(value, int) and value not in BIGINT_RANGE
+        for value in result
+    ):
+        raise QueryError(f'Слишком большое число в {name}')
+    return result
+
+
+def values(queryset, fields, available):
+    columns = dict.fromkeys(CURSOR_COLUMNS)
+    columns.update(dict.fromkeys(available[name] for name in fields))
+    return queryset.values(*columns)
+
+
+def users(queryset):
+    """
+    Пользователи со счетчиками из статистики одним запросом.
+
+    Недостающие строки статистики пересчитываются разом для всех.
+    """
+    rows = list(queryset.values(
+        *USER_COLUMNS, *(f'stats__{name}' for name in COUNTERS)
+    ))
+    missing = [
+        row['id'] for row in rows if row['stats__posts_count'] is None
+    ]
+    rebuilt = {
+        stats.user_id: stats for stats in counters.rebuild_users(missing)
+    } if missing else {}
+    result = []
+    for row in rows:
+        item = {name: row[name] for name in USER_COLUMNS}
+        stats = rebuilt.get(row['id'])
+        for name in COUNTERS:
+            item[name] = (
+                getattr(stats, name) if stats else row[f'stats__{name}']
+            )
+        result.append(item)
+    return result
+
+
+def picture(name, ready):
+    if not name:
+        return None
+    found = ready.get(name)
+    storage = Post._meta.get_field('image').storage
+    return {
+        'original': storage.url(name),
+        'src': found.url if found else None,
+        'srcset': found.srcset if found else None,
+        'sources': [
+            {'type': mime_type, 'srcset': srcset}
+            for mime_type, srcset in found.sources
+        ] if found else [],
+    }
+
+
+def serialize(rows, fields, available):
+    """Словари ответа из строк .values(); картинки — одним запросом."""
+    ready = {}
+    if 'image' in fields:
+        ready = thumbnails.get_ready_by_name(
+            [row['image'] for row in rows], 'card'
+        )
+    result = []
+    for row in rows:
+        item = {}
+        for name in fields:
+            value = row[available[name]]
+            item[name] = picture(value, ready) if name == 'image' else value
+        result.append(item)
+    return result
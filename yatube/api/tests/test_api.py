@@ -0,0 +1,245 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from posts import counters, thumbnails
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+image_gif = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Автор')
+        cls.reader = User.objects.create_user(username='Читатель')
+        cls.group = Group.objects.create(
+            title='Группа', slug='cats', description='Описание'
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.author, group=cls.group)
+            for i in range(settings.POST_LMT + 3)
+        )
+        cls.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=cls.author,
+            group=cls.group,
+            image=SimpleUploadedFile(
+                name='small.gif', content=image_gif, content_type='image/gif'
+            )
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        counters.rebuild_users([cls.author.pk])
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds_are_paged_by_cursor(self):
+        """Ленты отдают страницу постов и курсор следующей."""
+        for url in (
+            reverse('api:posts'),
+            reverse('api:group', args=[self.group.slug]),
+            reverse('api:profile', args=[self.author.username]),
+        ):
+            with self.subTest(url=url):
+                data = self.client.get(url).json()
+                self.assertEqual(len(data['results']), settings.POST_LMT)
+                self.assertEqual(data['results'][0]['id'], self.post.pk)
+                self.assertIsNone(data['previous'])
+                rest = self.client.get(url, {'after': data['next']}).json()
+                self.assertEqual(len(rest['results']), 4)
+                self.assertIsNone(rest['next'])
+                self.assertIsNotNone(rest['previous'])
+
+    def test_group_and_profile_headers(self):
+        group = self.client.get(
+            reverse('api:group', args=[self.group.slug])
+        ).json()['group']
+        self.assertEqual(group['title'], 'Группа')
+        author = self.client.get(
+            reverse('api:profile', args=[self.author.username])
+        ).json()['author']
+        self.assertEqual(author['username'], 'Автор')
+        self.assertEqual(author['posts_count'], settings.POST_LMT + 4)
+        self.assertEqual(author['followers_count'], 1)
+
+    def test_sparse_fields(self):
+        """?fields= оставляет в ответе только выбранные поля."""
+        data = self.client.get(
+            reverse('api:posts'), {'fields': 'id,author'}
+        ).json()
+        self.assertEqual(
+            data['results'][0], {'id': self.post.pk, 'author': 'Автор'}
+        )
+
+    def test_unknown_field_is_bad_request(self):
+        response = self.client.get(reverse('api:posts'), {'fields': 'secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['detail'])
+
+    def test_missing_objects_are_not_found(self):
+        for url in (
+            reverse('api:group', args=['nope']),
+            reverse('api:profile', args=['nobody']),
+            reverse('api:post', args=[0]),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_post_with_comments(self):
+        data = self.client.get(reverse('api:post', args=[self.post.pk])).json()
+        self.assertEqual(data['post']['text'], 'Пост с картинкой')
+        self.assertEqual(data['post']['comments_count'], 1)
+        [comment] = data['comments']['results']
+        self.assertEqual(comment['author'], 'Читатель')
+        self.assertEqual(comment['text'], 'Комментарий')
+
+    def test_image_is_placeholder_until_thumbnail_is_ready(self):
+        """Картинка — оригинал и готовые миниатюры с srcset."""
+        url = reverse('api:post', args=[self.post.pk])
+        image = self.client.get(url).json()['post']['image']
+        self.assertEqual(image['original'], self.post.image.url)
+        self.assertIsNone(image['src'])
+        source = ImageFile(self.post.image)
+        source.set_size((2, 1))
+        default.kvstore.set(source)
+        for geometry, image_format in (
+            ('320x113', 'WEBP'), ('960x339', 'JPEG'),
+        ):
+            thumbnail = thumbnails.backend.thumbnail_file(
+                self.post.image, geometry,
+                crop='center', upscale=True, format=image_format
+            )
+            thumbnail.set_size(tuple(map(int, geometry.split('x'))))
+            default.kvstore.set(thumbnail, source)
+        cache.clear()
+        image = self.client.get(url).json()['post']['image']
+        self.assertIn(' 960w', image['srcset'])
+        self.assertEqual(image['sources'][0]['type'], 'image/webp')
+
+    def test_not_modified(self):
+        """Повтор с ETag получает 304, закэшированный ответ — без базы."""
+        url = reverse('api:posts')
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        with self.assertNumQueries(0):
+            again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_queries_do_not_grow_with_page(self):
+        """Лента стоит одинаковое число запросов при любом числе постов."""
+        url = reverse('api:posts')
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(url)
+        Post.objects.bulk_create(
+            Post(text='Еще', author=self.author, image=f'posts/{i}.gif')
+            for i in range(settings.POST_LMT)
+        )
+        cache.clear()
+        with CaptureQueriesContext(connection) as after:
+            self.client.get(url)
+        self.assertEqual(len(before), len(after))
+
+    def test_follow_feed(self):
+        """Лента подписок идет через движок ленты и отдает 304 по ETag."""
+        url = reverse('api:follow')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        for engine in ('timeline', 'fanin'):
+            with self.subTest(engine=engine), self.settings(
+                FOLLOW_FEED_ENGINE=engine
+            ):
+                response = self.reader_client.get(url)
+                data = response.json()
+                self.assertEqual(data['results'][0]['id'], self.post.pk)
+                self.assertEqual(len(data['results']), settings.POST_LMT)
+                rest = self.reader_client.get(
+                    url, {'after': data['next']}
+                ).json()
+                self.assertEqual(len(rest['results']), 4)
+                again = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(again.status_code, 304)
+        response = self.reader_client.get(url)
+        Post.objects.get(pk=self.post.pk).delete()
+        again = self.reader_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(
+            self.client.post(reverse('api:posts')).status_code, 405
+        )
+
+    def test_batch_is_normalized(self):
+        """Пакет: посты, их авторы и группы, по запросу на модель."""
+        first = Post.objects.exclude(pk=self.post.pk).first()
+        params = {
+            'posts': f'{self.post.pk},{first.pk},0',
+            'users': 'Читатель',
+            'fields': 'text,author,group,image',
+        }
+        with self.assertNumQueries(4):
+            data = self.client.get(reverse('api:batch'), params).json()
+        self.assertEqual(
+            set(data['posts']), {str(self.post.pk), str(first.pk)}
+        )
+        post = data['posts'][str(self.post.pk)]
+        self.assertEqual(post['id'], self.post.pk)
+        self.assertEqual(post['author'], 'Автор')
+        self.assertEqual(set(data['users']), {'Автор', 'Читатель'})
+        self.assertEqual(data['users']['Автор']['followers_count'], 1)
+        self.assertEqual(data['groups']['cats']['title'], 'Группа')
+
+    def test_batch_rejects_bad_lists(self):
+        url = reverse('api:batch')
+        for params in (
+            {'posts': 'abc'},
+            {'posts': '99999999999999999999999'},
+            {'posts': ','.join(
+                map(str, range(1, settings.API_BATCH_LIMIT + 2))
+            )},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(
+                    self.client.get(url, params).status_code, 400
+                )
+
+    def test_batch_with_unknown_user_is_not_cached(self):
+        url = reverse('api:batch')
+        self.client.get(url, {'users': 'Новый'})
+        User.objects.create_user(username='Новый')
+        data = self.client.get(url, {'users': 'Новый'}).json()
+        self.assertIn('Новый', data['users'])
@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import urlsafe_base64_encode
+
+from posts.models import Comment, Follow, Post
+
+User = get_user_model()
+
+
+class SyncTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Автор')
+        cls.reader = User.objects.create_user(username='Читатель')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.url = reverse('api:sync')
+
+    def start(self):
+        data = self.reader_client.get(self.url).json()
+        self.assertEqual(data['changes'], [])
+        return data['token']
+
+    def test_needs_login_and_valid_token(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        for token in (
+            'мусор',
+            urlsafe_base64_encode('c²'.encode()),
+            urlsafe_base64_encode(('c' + '9' * 30).encode()),
+        ):
+            with self.subTest(token=token):
+                response = self.reader_client.get(self.url, {'token': token})
+                self.assertEqual(response.status_code, 400)
+
+    def test_changes_since_token(self):
+        """После токена приходят только новые изменения с данными."""
+        token = self.start()
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        gone = Post.objects.create(text='Удаленный', author=self.author)
+        gone_id = gone.pk
+        gone.delete()
+        # Сессия, пользователь, подписки, журнал, посты, комментарии.
+        with self.assertNumQueries(6):
+            data = self.reader_client.get(self.url, {'token': token}).json()
+        changes = {(c['type'], c['id']): c for c in data['changes']}
+        self.assertEqual(
+            changes['post', post.pk]['data']['text'], 'Новый пост'
+        )
+        self.assertEqual(
+            changes['comment', comment.pk]['data']['post'], post.pk
+        )
+        self.assertEqual(changes['post', gone_id]['action'], 'deleted')
+        self.assertIsNone(changes['post', gone_id]['data'])
+        self.assertFalse(data['more'])
+        again = self.reader_client.get(
+            self.url, {'token': data['token']}
+        ).json()
+        self.assertEqual(again['changes'], [])
+
+    @override_settings(SYNC_BATCH=2)
+    def test_batches(self):
+        token = self.start()
+        for i in range(3):
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+        first = self.reader_client.get(self.url, {'token': token}).json()
+        self.assertTrue(first['more'])
+        self.assertEqual(len(first['changes']), 2)
+        rest = self.reader_client.get(
+            self.url, {'token': first['token']}
+        ).json()
+        self.assertFalse(rest['more'])
+        self.assertEqual(rest['changes'][0]['data']['text'], 'Пост 2')
+
+    def test_unfollowed_authors_stop_syncing(self):
+        token = self.start()
+        Follow.objects.filter(user=self.reader).delete()
+        Post.objects.create(text='Пост', author=self.author)
+        data = self.reader_client.get(self.url, {'token': token}).json()
+        [change] = data['changes']
+        self.assertEqual(
+            (change['type'], change['action'], change['id']),
+            ('follow', 'deleted', self.author.pk)
+        )
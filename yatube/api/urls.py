@@ -0,0 +1,15 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', views.posts, name='posts'),
+    path('posts/<int:post_id>/', views.post_detail, name='post'),
+    path('groups/<slug:slug>/', views.group, name='group'),
+    path('profiles/<str:username>/', views.profile, name='profile'),
+    path('follow/', views.follow, name='follow'),
+    path('batch/', views.batch, name='batch'),
+    path('sync/', views.sync, name='sync'),
+]
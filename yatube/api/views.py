@@ -0,0 +1,300 @@
+"""
+JSON API только для чтения: те же ленты и страницы, что в posts.views.
+
+Ответы собираются из строк .values() без экземпляров моделей, списки
+листаются курсорами ?after= и ?before=, а ?fields= выбирает поля
+постов и комментариев. Анонимные ответы лежат в кэше страниц, а ETag и
+Last-Modified считаются так же, как для HTML (posts.conditional).
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
+
+from core.decorators import anonymous_page_cache
+from posts import changelog, conditional
+from posts.caching import FEED_INDEX, author_tag, group_tag, post_tag
+from posts.conditional import conditional_page
+from posts.models import Change, Comment, Group, Post, User
+from posts.paginators import ValuesCursorPaginator
+from posts.views import get_follow_paginator
+
+from .serializers import (
+    COMMENT_FIELDS, GROUP_COLUMNS, POST_FIELDS, QueryError, parse_fields,
+    parse_list, serialize, users, values
+)
+
+
+def json_response(data, status=200, tags=None):
+    response = JsonResponse(
+        data, status=status, json_dumps_params={'ensure_ascii': False}
+    )
+    if tags is not None:
+        response.cache_tags = tags
+    return response
+
+
+def error(detail, status):
+    return json_response({'detail': detail}, status=status)
+
+
+def api_view(view):
+    """Неверные параметры запроса (QueryError) — ответ 400 с описанием."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except QueryError as exc:
+            return error(str(exc), 400)
+    return wrapper
+
+
+def get_list(request, queryset, available, per_page, fields=None,
+             descending=True):
+    """Страница строк по курсору из ?after= или ?before= и id на ней."""
+    if fields is None:
+        fields = parse_fields(request, available)
+    paginator = ValuesCursorPaginator(
+        values(queryset, fields, available), per_page, descending=descending
+    )
+    page = paginator.get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    rows = list(page)
+    data = {
+        'results': serialize(rows, fields, available),
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }
+    return data, [row['id'] for row in rows]
+
+
+def post_feed(request, queryset, *tags, **extra):
+    data, ids = get_list(request, queryset, POST_FIELDS, settings.POST_LMT)
+    return json_response(
+        {**extra, **data},
+        tags=[*tags, *(post_tag(post_id) for post_id in ids)]
+    )
+
+
+@require_safe
+@anonymous_page_cache
+@conditional_page(conditional.index_state)
+@api_view
+def posts(request):
+    return post_feed(request, Post.objects.all(), FEED_INDEX)
+
+
+@require_safe
+@anonymous_page_cache
+@conditional_page(conditional.group_state)
+@api_view
+def group(request, slug):
+    found = Group.objects.filter(slug=slug).values(*GROUP_COLUMNS).first()
+    if found is None:
+        return error('Группа не найдена', 404)
+    return post_feed(
+        request,
+        Post.objects.filter(group_id=found['id']),
+        group_tag(slug),
+        group=found
+    )
+
+
+@require_safe
+@anonymous_page_cache
+@conditional_page(conditional.profile_state)
+@api_view
+def profile(request, username):
+    found = users(User.objects.filter(username=username))
+    if not found:
+        return error('Пользователь не найден', 404)
+    [author] = found
+    return post_feed(
+        request,
+        Post.objects.filter(author_id=author['id']),
+        author_tag(author['id']),
+        author=author
+    )
+
+
+@require_safe
+@anonymous_page_cache
+@conditional_page(conditional.post_state)
+@api_view
+def post_detail(request, post_id):
+    fields = parse_fields(request, POST_FIELDS)
+    row = values(
+        Post.objects.filter(pk=post_id), fields, POST_FIELDS
+    ).first()
+    if row is None:
+        return error('Пост не найден', 404)
+    order = 'old' if request.GET.get('order') == 'old' else 'new'
+    # ?fields= относится к посту, у комментариев поля всегда все.
+    comments, _ = get_list(
+        request,
+        Comment.objects.filter(post_id=post_id),
+        COMMENT_FIELDS,
+        settings.COMMENT_LMT,
+        fields=list(COMMENT_FIELDS),
+        descending=order == 'new'
+    )
+    return json_response(
+        {
+            'post': serialize([row], fields, POST_FIELDS)[0],
+            'comments': comments,
+        },
+        tags=[post_tag(post_id)]
+    )
+
+
+@require_safe
+@conditional_page(conditional.follow_state)
+@api_view
+def follow(request):
+    """
+    Лента подписок тем же движком, что и follow_index (FOLLOW_FEED_ENGINE):
+    он дает id постов страницы, а данные берутся одним .values().
+    """
+    if not request.user.is_authenticated:
+        return error('Нужно войти', 403)
+    fields = parse_fields(request, POST_FIELDS)
+    page = get_follow_paginator(
+        request.user, Post.objects.only('id', 'pub_date')
+    ).get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    ids = [post.pk for post in page]
+    rows = {
+        row['id']: row for row in values(
+            Post.objects.filter(pk__in=ids).order_by(), fields, POST_FIELDS
+        )
+    }
+    return json_response({
+        'results': serialize(
+            [rows[pk] for pk in ids if pk in rows], fields, POST_FIELDS
+        ),
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@require_safe
+@anonymous_page_cache
+@api_view
+def batch(request):
+    """
+    Посты, пользователи и группы для целого экрана одним запросом.
+
+    ?posts=1,2&users=leo&groups=cats — по одному запросу IN на каждую
+    модель. Авторы и группы найденных постов добавляются сами, ответ
+    нормализован: пост ссылается на них по username и slug. Чего нет в
+    базе, того нет и в ответе.
+    """
+    post_ids = parse_list(request, 'posts', int)
+    usernames = set(parse_list(request, 'users'))
+    slugs = set(parse_list(request, 'groups'))
+    if len(post_ids) + len(usernames) + len(slugs) > settings.API_BATCH_LIMIT:
+        raise QueryError(
+            f'За раз можно запросить не больше {settings.API_BATCH_LIMIT}'
+        )
+    # По id пост ищется в ответе, поэтому id есть всегда.
+    fields = list(dict.fromkeys(['id', *parse_fields(request, POST_FIELDS)]))
+    rows = list(values(
+        Post.objects.filter(pk__in=post_ids), fields, POST_FIELDS
+    )) if post_ids else []
+    usernames.update(row.get('author__username') for row in rows)
+    slugs.update(row.get('group__slug') for row in rows)
+    usernames.discard(None)
+    slugs.discard(None)
+    found_users = users(
+        User.objects.filter(username__in=usernames)
+    ) if usernames else []
+    found_groups = list(
+        Group.objects.filter(slug__in=slugs).values(*GROUP_COLUMNS)
+    ) if slugs else []
+    data = {
+        'posts': {
+            item['id']: item for item in serialize(rows, fields, POST_FIELDS)
+        },
+        'users': {item['username']: item for item in found_users},
+        'groups': {item['slug']: item for item in found_groups},
+    }
+    tags = [
+        *(post_tag(post_id) for post_id in post_ids),
+        *(author_tag(item['id']) for item in found_users),
+        *(group_tag(slug) for slug in slugs),
+    ]
+    # Появление нового пользователя не сбрасывает ничьих тегов, поэтому
+    # ответ, где кого-то не нашлось, в кэш страниц не кладется.
+    if len(found_users) < len(usernames):
+        tags = None
+    return json_response(data, tags=tags)
+
+
+def changed_objects(changes):
+    """Текущие данные созданных и измененных объектов: запрос на тип."""
+    ids = {kind: [] for kind, _ in Change.KINDS}
+    for change in changes:
+        if change['action'] != Change.DELETED:
+            ids[change['type']].append(change['id'])
+    found = {}
+    if ids[Change.POST]:
+        fields = list(POST_FIELDS)
+        rows = values(
+            Post.objects.filter(pk__in=ids[Change.POST]).order_by(),
+            fields,
+            POST_FIELDS
+        )
+        for item in serialize(list(rows), fields, POST_FIELDS):
+            found[Change.POST, item['id']] = item
+    if ids[Change.COMMENT]:
+        fields = list(COMMENT_FIELDS)
+        rows = values(
+            Comment.objects.filter(pk__in=ids[Change.COMMENT]).order_by(),
+            fields,
+            COMMENT_FIELDS
+        )
+        for item in serialize(list(rows), fields, COMMENT_FIELDS):
+            found[Change.COMMENT, item['id']] = item
+    if ids[Change.FOLLOW]:
+        for item in users(User.objects.filter(pk__in=ids[Change.FOLLOW])):
+            found[Change.FOLLOW, item['id']] = item
+    return found
+
+
+@require_safe
+@api_view
+def sync(request):
+    """
+    Изменения ленты пользователя после ?token= пачками по SYNC_BATCH.
+
+    Без токена изменений нет, а отдается токен текущего конца журнала:
+    клиент скачивает ленты один раз и дальше только синхронизируется.
+    У удаленных объектов data — null; у подписок id — это id автора.
+    Пока more — true, следующую пачку надо запросить сразу.
+    """
+    if not request.user.is_authenticated:
+        return error('Нужно войти', 403)
+    token = request.GET.get('token')
+    if not token:
+        return json_response({
+            'changes': [], 'token': changelog.latest_token(), 'more': False,
+        })
+    since = changelog.decode_token(token)
+    if since is None:
+        raise QueryError('Неверный токен синхронизации')
+    changes, last, more = changelog.changes_for(
+        request.user, since, settings.SYNC_BATCH
+    )
+    found = changed_objects(changes)
+    for change in changes:
+        change['data'] = found.get((change['type'], change['id']))
+    return json_response({
+        'changes': changes,
+        'token': changelog.encode_token(last),
+        'more': more,
+    })
@@ -0,0 +1,86 @@
+"""
+Кэш с инвалидацией по тегам.
+
+Каждому тегу (например, 'post:1', 'author:2', 'group:cats', 'feed:index')
+соответствует счетчик версии в кэше. Ключ записи строится из версий всех
+ее тегов, поэтому увеличение версии одного тега делает недоступными
+только записи с этим тегом, а сами записи доживают свой срок и
+вытесняются кэшем.
+
+Версии тегов хранятся в кэше 'default', сами значения — в кэше
+settings.TAGGED_CACHE. Ключ значения меняется вместе с версиями, поэтому
+запись можно держать и в памяти процесса, не боясь отдать устаревшую.
+
+Запись в базу сбрасывает теги через invalidate_on_commit: версии
+сдвигаются сразу и еще раз после коммита, иначе параллельный запрос,
+прочитавший строки до коммита, положил бы устаревшую страницу уже под
+новыми версиями.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import transaction
+from django.utils.encoding import force_bytes
+
+TAG_KEY = 'tag:{}'
+VALUE_KEY = 'tagged:{}:{}'
+
+
+def initial_version():
+    # После вытеснения счетчика версия не должна вернуться к старой.
+    return time.time_ns()
+
+
+def tag_versions(tags):
+    keys = {TAG_KEY.format(tag): tag for tag in tags}
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, initial_version(), None)
+            versions[key] = cache.get(key)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def make_key(name, tags, vary_on=()):
+    versions = tag_versions(tags)
+    raw = '|'.join(
+        [str(part) for part in vary_on]
+        + [f'{tag}={versions[tag]}' for tag in sorted(versions)]
+    )
+    return VALUE_KEY.format(name, hashlib.md5(force_bytes(raw)).hexdigest())
+
+
+def values_cache():
+    return caches[settings.TAGGED_CACHE]
+
+
+def get(name, tags, vary_on=(), default=None):
+    return values_cache().get(make_key(name, tags, vary_on), default)
+
+
+def set(name, value, tags, vary_on=(), timeout=DEFAULT_TIMEOUT):
+    values_cache().set(make_key(name, tags, vary_on), value, timeout)
+
+
+def get_or_set(name, tags, func, vary_on=(), timeout=DEFAULT_TIMEOUT):
+    return values_cache().get_or_set(
+        make_key(name, tags, vary_on), func, timeout
+    )
+
+
+def invalidate(*tags):
+    for tag in tags:
+        key = TAG_KEY.format(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, initial_version(), None)
+
+
+def invalidate_on_commit(*tags, using=None):
+    invalidate(*tags)
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(lambda: invalidate(*tags), using=using)
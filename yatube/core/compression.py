@@ -0,0 +1,77 @@
+"""
+Сжатие ответов и файлов gzip и, если установлен пакет brotli, br.
+
+Общий код для CompressionMiddleware, кэша страниц, который хранит
+сжатые тела рядом с исходным, и сжатой статики из collectstatic.
+"""
+import gzip
+import zlib
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Расширения сжатых копий файлов.
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def encodings():
+    """Доступные кодирования в порядке предпочтения."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(data, level=None, codings=None):
+    """
+    {кодирование: сжатые байты} для codings, по умолчанию — для всех
+    доступных кодирований.
+
+    Кодирования, которые не уменьшили данные, пропускаются.
+    """
+    if level is None:
+        level = settings.COMPRESS_LEVEL
+    if codings is None:
+        codings = encodings()
+    compressed = {}
+    if 'gzip' in codings:
+        compressed['gzip'] = gzip.compress(data, level, mtime=0)
+    if 'br' in codings and brotli is not None:
+        compressed['br'] = brotli.compress(data, quality=level)
+    return {
+        coding: body for coding, body in compressed.items()
+        if len(body) < len(data)
+    }
+
+
+def compressible(response):
+    """Стоит ли сжимать ответ: тип из COMPRESS_CONTENT_TYPES и размер."""
+    if response.has_header('Content-Encoding'):
+        return False
+    content_type = response.get('Content-Type', '').split(';')[0].strip()
+    if content_type not in settings.COMPRESS_CONTENT_TYPES:
+        return False
+    if response.streaming:
+        return True
+    return len(response.content) >= settings.COMPRESS_MIN_SIZE
+
+
+def compress_stream(chunks, level=None):
+    """
+    Потоковое сжатие gzip.
+
+    После каждого куска поток сбрасывается (Z_SYNC_FLUSH), чтобы клиент
+    получал начало страницы, не дожидаясь конца.
+    """
+    if level is None:
+        level = settings.COMPRESS_LEVEL
+    # wbits=31 — формат gzip, а не голый deflate.
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,89 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.encoding import force_bytes
+from django.utils.http import parse_http_date_safe
+
+from core import cache_tags, compression
+
+TAGS_KEY = 'page:tags:{}'
+VALIDATORS = ('ETag', 'Last-Modified')
+
+
+def anonymous_page_cache(view):
+    """
+    Кэширует готовую страницу целиком для анонимных посетителей.
+
+    Вьюха помечает ответ списком тегов в response.cache_tags; страница
+    живет в кэше, пока не сменится версия любого из них. Ответы без
+    тегов, с cookies и запросы авторизованных пользователей не кэшируются.
+    Вместе со страницей хранятся ее сжатые варианты для
+    core.middleware.CompressionMiddleware и заголовки ETag и Last-Modified,
+    так что на условный запрос к ней ответ 304 дается без базы.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated):
+            return view(request, *args, **kwargs)
+        path = request.get_full_path()
+        tags_key = TAGS_KEY.format(
+            hashlib.md5(force_bytes(path)).hexdigest()
+        )
+        tags = cache.get(tags_key)
+        if tags is not None:
+            cached = cache_tags.get('page', tags, [path])
+            if cached is not None:
+                content, content_type, compressed, validators = cached
+                # Условный запрос к закэшированной странице решается
+                # без обращения к базе.
+                response = get_conditional_response(
+                    request,
+                    etag=validators.get('ETag'),
+                    last_modified=parse_http_date_safe(
+                        validators.get('Last-Modified')
+                    )
+                )
+                if response is None:
+                    response = HttpResponse(
+                        content, content_type=content_type
+                    )
+                    response.compressed = compressed
+                for header, value in validators.items():
+                    response[header] = value
+                patch_vary_headers(response, ('Cookie',))
+                return response
+        response = view(request, *args, **kwargs)
+        tags = getattr(response, 'cache_tags', None)
+        if (tags is not None and response.status_code == 200
+                and not response.streaming and not response.cookies
+                and not request.META.get('CSRF_COOKIE_USED')):
+            timeout = settings.PAGE_CACHE_TIMEOUT
+            # Сжатые тела хранятся рядом с исходным, чтобы горячая
+            # страница сжималась один раз, а не на каждый запрос.
+            response.compressed = (
+                compression.compress(response.content)
+                if compression.compressible(response) else {}
+            )
+            cache.set(tags_key, tags, timeout)
+            cache_tags.set(
+                'page',
+                (
+                    response.content,
+                    response['Content-Type'],
+                    response.compressed,
+                    {
+                        header: response[header]
+                        for header in VALIDATORS if response.has_header(header)
+                    }
+                ),
+                tags,
+                [path],
+                timeout
+            )
+        return response
+    return wrapper
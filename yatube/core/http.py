@@ -0,0 +1,39 @@
+"""Выбор кодирования ответа по заголовку Accept-Encoding."""
+import re
+
+# Кодирования в порядке предпочтения сервера: br сжимает текст лучше gzip.
+ENCODINGS = ('br', 'gzip')
+QUALITY_RE = re.compile(r'q=([0-9.]+)')
+
+
+def accepted_encodings(request):
+    """{кодирование: q} из Accept-Encoding, включая явные q=0."""
+    accepted = {}
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        match = QUALITY_RE.search(params)
+        try:
+            accepted[coding] = float(match.group(1)) if match else 1.0
+        except ValueError:
+            continue
+    return accepted
+
+
+def choose_encoding(request, available=ENCODINGS):
+    """
+    Лучшее из available, что принимает клиент, или None.
+
+    При равных весах побеждает то, что раньше в available.
+    """
+    accepted = accepted_encodings(request)
+    default = accepted.get('*', 0)
+    best, best_quality = None, 0
+    for coding in available:
+        quality = accepted.get(coding, default)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
@@ -0,0 +1,57 @@
+from django.utils.cache import patch_vary_headers
+
+from . import compression
+from .http import choose_encoding
+
+
+class CompressionMiddleware:
+    """
+    Сжимает HTML и JSON кодированием, которое принимает клиент.
+
+    Если тело уже сжато заранее (кэш страниц кладет сжатые варианты в
+    response.compressed), повторно оно не сжимается; иначе сжимается
+    только выбранным кодированием. Потоковые ответы сжимаются gzip по
+    мере отдачи.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not compression.compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if response.streaming:
+            if choose_encoding(request, ('gzip',)):
+                response.streaming_content = compression.compress_stream(
+                    response.streaming_content
+                )
+                del response['Content-Length']
+                self.set_encoding(response, 'gzip')
+            return response
+        compressed = getattr(response, 'compressed', None)
+        if compressed is None:
+            encoding = choose_encoding(request, compression.encodings())
+            if not encoding:
+                return response
+            compressed = compression.compress(
+                response.content, codings=(encoding,)
+            )
+        else:
+            encoding = choose_encoding(request, [
+                coding for coding in compression.encodings()
+                if coding in compressed
+            ])
+        if encoding in compressed:
+            response.content = compressed[encoding]
+            response['Content-Length'] = str(len(response.content))
+            self.set_encoding(response, encoding)
+        return response
+
+    def set_encoding(self, response, encoding):
+        response['Content-Encoding'] = encoding
+        # Сжатое тело уже не совпадает байт в байт с исходным.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
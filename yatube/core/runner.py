@@ -0,0 +1,43 @@
+"""
+Тесты в стороне от работающего сайта.
+
+Кэш 'default' — файл SQLite, общий для всех процессов на хосте, поэтому
+тесты (а они вызывают cache.clear()) получают свой файл во временном
+каталоге: работающий сайт и параллельные прогоны друг другу не мешают.
+Картинки обрабатываются сразу после коммита, а не в пуле потоков:
+тестовая база SQLite в памяти общая для потоков и при блокировке
+таблицы не ждет, а падает. Настройки включает TestRunner для
+manage.py test и conftest.py в корне репозитория для pytest.
+"""
+import copy
+import os
+import shutil
+import tempfile
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+@contextmanager
+def isolated_settings():
+    cache_dir = tempfile.mkdtemp(prefix='yatube-cache-')
+    caches = copy.deepcopy(settings.CACHES)
+    caches['default']['LOCATION'] = os.path.join(cache_dir, 'cache.sqlite3')
+    try:
+        with override_settings(CACHES=caches, THUMBNAIL_WORKERS=0):
+            yield
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.isolated_settings = ExitStack()
+        self.isolated_settings.enter_context(isolated_settings())
+
+    def teardown_test_environment(self, **kwargs):
+        self.isolated_settings.close()
+        super().teardown_test_environment(**kwargs)
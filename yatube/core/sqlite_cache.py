@@ -0,0 +1,378 @@
+"""
+Общий для всех процессов кэш в файле SQLite.
+
+В отличие от LocMemCache, один файл видят все WSGI-воркеры на хосте,
+поэтому попадания не падают с ростом числа воркеров, а инвалидация
+доходит до каждого процесса. Внешний сервис не нужен.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.sqlite_cache.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube/cache.sqlite3',
+            'OPTIONS': {
+                'MAX_SIZE': 64 * 1024 * 1024,
+                'COMPRESS_MIN_LENGTH': 1024,
+                'COMPRESS_LEVEL': 6,
+            },
+        }
+    }
+
+MAX_SIZE ограничивает суммарный размер значений в байтах: при
+превышении вытесняются записи, к которым дольше всего не обращались.
+Чтение ничего не пишет: время обращения копится в памяти процесса и
+записывается одной пачкой раз в TOUCH_FLUSH_INTERVAL секунд или вместе с
+ближайшей записью, так что горячие чтения не встают в очередь за
+блокировкой записи. Каждая запись попутно удаляет пачку истекших строк.
+Значения длиннее COMPRESS_MIN_LENGTH байт сжимаются zlib (0 отключает
+сжатие). incr и add выполняются в одной транзакции и потому атомарны.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' compressed INTEGER NOT NULL,'
+    ' size INTEGER NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL'
+    ')',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+    'CREATE TABLE IF NOT EXISTS cache_size (total INTEGER NOT NULL)',
+    'INSERT INTO cache_size (total) SELECT 0'
+    ' WHERE NOT EXISTS (SELECT 1 FROM cache_size)',
+)
+# Обращение к записи отмечается не чаще раза в секунду, а накопленные
+# отметки пишутся раз в TOUCH_FLUSH_INTERVAL секунд или по TOUCH_BATCH.
+TOUCH_RESOLUTION = 1.0
+TOUCH_FLUSH_INTERVAL = 5.0
+TOUCH_BATCH = 500
+EVICT_BATCH = 100
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = location
+        self.max_size = int(options.get('MAX_SIZE', 64 * 1024 * 1024))
+        self.compress_min_length = int(
+            options.get('COMPRESS_MIN_LENGTH', 1024)
+        )
+        self.compress_level = int(options.get('COMPRESS_LEVEL', 6))
+        self._local = threading.local()
+        self._touches = {}
+        self._touches_lock = threading.Lock()
+        self._touches_flushed = time.monotonic()
+
+    # Соединения
+
+    @property
+    def connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None,
+                check_same_thread=False
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            with self.transaction(connection):
+                for statement in SCHEMA:
+                    connection.execute(statement)
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    def transaction(self, connection=None):
+        return _Transaction(connection or self.connection)
+
+    # Сериализация
+
+    def encode(self, value):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if self.compress_min_length and len(data) >= self.compress_min_length:
+            return zlib.compress(data, self.compress_level), 1
+        return data, 0
+
+    def decode(self, data, compressed):
+        if compressed:
+            data = zlib.decompress(data)
+        return pickle.loads(data)
+
+    # Внутренние операции внутри транзакции
+
+    def _select(self, connection, key, now):
+        row = connection.execute(
+            'SELECT value, compressed, expires, accessed FROM cache '
+            'WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, compressed, expires, accessed = row
+        if expires is not None and expires <= now:
+            return None
+        return value, compressed, accessed
+
+    def _write(self, connection, key, value, timeout, now):
+        data, compressed = self.encode(value)
+        expires = self.get_backend_timeout(timeout)
+        old = connection.execute(
+            'SELECT size FROM cache WHERE key = ?', (key,)
+        ).fetchone()
+        connection.execute(
+            'INSERT OR REPLACE INTO cache '
+            '(key, value, compressed, size, expires, accessed) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (key, data, compressed, len(data), expires, now)
+        )
+        connection.execute(
+            'UPDATE cache_size SET total = total + ?',
+            (len(data) - (old[0] if old else 0),)
+        )
+
+    def _remove(self, connection, where, params=()):
+        removed = connection.execute(
+            f'SELECT COALESCE(SUM(size), 0) FROM cache WHERE {where}', params
+        ).fetchone()[0]
+        connection.execute(f'DELETE FROM cache WHERE {where}', params)
+        connection.execute(
+            'UPDATE cache_size SET total = total - ?', (removed,)
+        )
+        return removed
+
+    def _cull(self, connection, now):
+        """Удаляет пачку истекших записей, не дожидаясь переполнения."""
+        self._remove(
+            connection,
+            'key IN (SELECT key FROM cache WHERE expires IS NOT NULL '
+            'AND expires <= ? LIMIT ?)',
+            (now, EVICT_BATCH)
+        )
+
+    def _take_touches(self):
+        with self._touches_lock:
+            touches, self._touches = self._touches, {}
+            self._touches_flushed = time.monotonic()
+        return touches
+
+    def _apply_touches(self, connection, touches):
+        connection.executemany(
+            'UPDATE cache SET accessed = ? WHERE key = ? AND accessed < ?',
+            [(when, key, when) for key, when in touches.items()]
+        )
+
+    def _touch(self, keys, now):
+        """Запоминает обращение; пишет накопленное, когда пора."""
+        with self._touches_lock:
+            for key in keys:
+                self._touches[key] = now
+            due = (
+                len(self._touches) >= TOUCH_BATCH
+                or time.monotonic() - self._touches_flushed
+                >= TOUCH_FLUSH_INTERVAL
+            )
+        if due:
+            self.flush_touches()
+
+    def flush_touches(self):
+        touches = self._take_touches()
+        if touches:
+            with self.transaction() as connection:
+                self._apply_touches(connection, touches)
+
+    def _before_write(self, connection, now):
+        # Запись все равно берет блокировку: отметки и чистка — попутно.
+        touches = self._take_touches()
+        if touches:
+            self._apply_touches(connection, touches)
+        self._cull(connection, now)
+
+    def _evict(self, connection, now):
+        total = connection.execute(
+            'SELECT total FROM cache_size'
+        ).fetchone()[0]
+        if total <= self.max_size:
+            return
+        total -= self._remove(
+            connection, 'expires IS NOT NULL AND expires <= ?', (now,)
+        )
+        excess = total - self.max_size
+        victims = []
+        rows = connection.execute(
+            'SELECT key, size FROM cache ORDER BY accessed, rowid'
+        )
+        for key, size in rows:
+            if excess <= 0:
+                break
+            victims.append(key)
+            excess -= size
+        rows.close()
+        for start in range(0, len(victims), EVICT_BATCH):
+            batch = victims[start:start + EVICT_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            self._remove(connection, f'key IN ({placeholders})', batch)
+
+    # API кэша Django
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        now = time.time()
+        row = self._select(self.connection, key, now)
+        if row is None:
+            return default
+        value, compressed, accessed = row
+        if now - accessed >= TOUCH_RESOLUTION:
+            self._touch([key], now)
+        return self.decode(value, compressed)
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_key(key, version=version): key for key in keys}
+        for key in keys:
+            self.validate_key(key)
+        if not keys:
+            return {}
+        now = time.time()
+        placeholders = ','.join('?' * len(keys))
+        rows = self.connection.execute(
+            'SELECT key, value, compressed, expires, accessed FROM cache '
+            f'WHERE key IN ({placeholders})', list(keys)
+        ).fetchall()
+        rows = [
+            row for row in rows if row[3] is None or row[3] > now
+        ]
+        stale = [
+            key for key, _, _, _, accessed in rows
+            if now - accessed >= TOUCH_RESOLUTION
+        ]
+        if stale:
+            self._touch(stale, now)
+        return {
+            keys[key]: self.decode(value, compressed)
+            for key, value, compressed, _, _ in rows
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        now = time.time()
+        with self.transaction() as connection:
+            self._before_write(connection, now)
+            self._write(connection, key, value, timeout, now)
+            self._evict(connection, now)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        with self.transaction() as connection:
+            self._before_write(connection, now)
+            for key, value in data.items():
+                key = self.make_key(key, version=version)
+                self.validate_key(key)
+                self._write(connection, key, value, timeout, now)
+            self._evict(connection, now)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        now = time.time()
+        with self.transaction() as connection:
+            if self._select(connection, key, now) is not None:
+                return False
+            self._before_write(connection, now)
+            self._write(connection, key, value, timeout, now)
+            self._evict(connection, now)
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        now = time.time()
+        with self.transaction() as connection:
+            row = self._select(connection, key, now)
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = self.decode(row[0], row[1]) + delta
+            data, compressed = self.encode(value)
+            connection.execute(
+                'UPDATE cache SET value = ?, compressed = ?, size = ?, '
+                'accessed = ? WHERE key = ?',
+                (data, compressed, len(data), now, key)
+            )
+            connection.execute(
+                'UPDATE cache_size SET total = total + ? - ?',
+                (len(data), len(row[0]))
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        now = time.time()
+        with self.transaction() as connection:
+            if self._select(connection, key, now) is None:
+                return False
+            connection.execute(
+                'UPDATE cache SET expires = ?, accessed = ? WHERE key = ?',
+                (self.get_backend_timeout(timeout), now, key)
+            )
+        return True
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._select(self.connection, key, time.time()) is not None
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self.transaction() as connection:
+            self._remove(connection, 'key = ?', (key,))
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(key, version=version) for key in keys]
+        for key in keys:
+            self.validate_key(key)
+        if not keys:
+            return
+        placeholders = ','.join('?' * len(keys))
+        with self.transaction() as connection:
+            self._remove(connection, f'key IN ({placeholders})', keys)
+
+    def clear(self):
+        with self.transaction() as connection:
+            connection.execute('DELETE FROM cache')
+            connection.execute('UPDATE cache_size SET total = 0')
+
+    def close(self, **kwargs):
+        # Соединение переиспользуется между запросами одного потока.
+        pass
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE сразу берет блокировку записи на весь файл."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.connection.execute('COMMIT')
+        else:
+            self.connection.execute('ROLLBACK')
@@ -0,0 +1,124 @@
+"""
+Файловые хранилища: медиа с адресацией по содержимому и сжатая статика.
+
+Файл хэшируется SHA-256 прямо во время записи во временный файл и
+кладется под именем из хэша с раскладкой по подкаталогам:
+
+    posts/3f/a9/3fa9…c1.jpg
+
+Повторная загрузка той же картинки не занимает места — имя совпадает
+с уже сохраненным файлом. Два уровня по 256 подкаталогов держат
+каталоги маленькими, и поиск файла не замедляется с ростом медиатеки.
+Оригинальное имя файла не сохраняется, остается только расширение.
+
+Одинаковые файлы разделяют одно имя, поэтому файлы не удаляются при
+замене: на тот же файл может ссылаться другая запись, в том числе еще
+не зафиксированная. Осиротевшие файлы старше срока удаляет команда
+delete_orphan_images; повторная загрузка существующего файла обновляет
+его время изменения, чтобы он снова пережил этот срок.
+
+CompressedManifestStaticFilesStorage при collectstatic дописывает хэш
+содержимого в имена файлов и кладет рядом с текстовыми файлами сжатые
+копии .gz и .br (см. core.compression). Отдает их
+core.views.serve_static.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+from . import compression
+
+INCOMING_DIR = '.incoming'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    hash_levels = 2
+    hash_width = 2
+
+    def get_available_name(self, name, max_length=None):
+        # Имя все равно заменяется хэшем в _save, а совпадение имен
+        # означает совпадение содержимого.
+        return name
+
+    def hashed_name(self, directory, digest, ext):
+        shards = [
+            digest[i * self.hash_width:(i + 1) * self.hash_width]
+            for i in range(self.hash_levels)
+        ]
+        return posixpath.join(directory, *shards, digest + ext)
+
+    def _save(self, name, content):
+        directory, basename = posixpath.split(name.replace('\\', '/'))
+        ext = os.path.splitext(basename)[1].lower()
+        incoming = self.path(INCOMING_DIR)
+        os.makedirs(incoming, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=incoming, suffix=ext)
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+            name = self.hashed_name(directory, digest.hexdigest(), ext)
+            full_path = self.path(name)
+            if not os.path.exists(full_path):
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                # Переименование в пределах одной ФС атомарно: параллельная
+                # загрузка того же файла просто перезапишет его тем же.
+                os.replace(temp_path, full_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(full_path, self.file_permissions_mode)
+            else:
+                # Новая ссылка на старый файл: сборщик сирот отсчитывает
+                # срок заново.
+                os.utime(full_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return name
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # Картинки и шрифты уже сжаты, повторное сжатие их только увеличит.
+    compress_extensions = (
+        '.css', '.js', '.svg', '.html', '.txt', '.json', '.xml', '.ico',
+        '.map',
+    )
+    compress_min_size = 256
+    # Статика сжимается один раз при сборке, поэтому сильнее всего.
+    compress_level = 9
+    manifest_strict = False
+
+    def stored_name(self, name):
+        # Без collectstatic (в разработке и тестах) — исходное имя.
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, *args, **kwargs):
+        yield from super().post_process(*args, **kwargs)
+        if kwargs.get('dry_run'):
+            return
+        for name in set(self.hashed_files.values()):
+            if name.endswith(self.compress_extensions):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as original:
+            data = original.read()
+        if len(data) < self.compress_min_size:
+            return
+        compressed = compression.compress(data, self.compress_level)
+        for coding, body in compressed.items():
+            suffix = compression.SUFFIXES[coding]
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(body))
@@ -0,0 +1,60 @@
+"""
+Потоковая отдача страниц со списками.
+
+Шаблон рендерится как обычно, но блок {% stream %} (см.
+core.templatetags.streaming) откладывается, а на его месте остается
+метка. Клиент сразу получает <head> и шапку и начинает грузить CSS,
+а элементы циклов {% for %} из блока рендерятся и уходят по одному,
+пока он это делает. В памяти одновременно держится только один
+отрендеренный элемент.
+
+Потоковый ответ не попадает в кэш страниц, а фрагменты {% tagcache %}
+с отложенным блоком не кэшируются, поэтому режим подходит для страниц,
+которые и так рендерятся на каждый запрос.
+"""
+import re
+import secrets
+
+from django.http import StreamingHttpResponse
+from django.template import loader
+
+# Имя переменной контекста, через которую {% stream %} находит поток.
+CONTEXT_KEY = 'stream'
+
+
+class Stream:
+    """Отложенные блоки одной страницы и метки на их местах."""
+
+    def __init__(self):
+        self.token = secrets.token_hex(8)
+        self.pending = {}
+
+    def defer(self, render_items):
+        marker = f'<!--stream:{self.token}:{len(self.pending)}-->'
+        self.pending[marker] = render_items
+        return marker
+
+    def contains(self, html):
+        return self.token in html
+
+    def chunks(self, html):
+        pattern = re.compile(f'(<!--stream:{self.token}:[0-9]+-->)')
+        for part in pattern.split(html):
+            if part in self.pending:
+                yield from self.pending.pop(part)()
+            elif part:
+                yield part
+
+
+def render(request, template_name, context):
+    """
+    Как django.shortcuts.render, но StreamingHttpResponse.
+
+    Шаблон без отложенных блоков рендерится сразу, чтобы ошибки в нем
+    давали обычный ответ 500, а не оборванную страницу.
+    """
+    stream = Stream()
+    html = loader.get_template(template_name).render(
+        {**context, CONTEXT_KEY: stream}, request
+    )
+    return StreamingHttpResponse(stream.chunks(html))
@@ -0,0 +1,73 @@
+from django import template
+
+from core import cache_tags
+from core.streaming import CONTEXT_KEY
+
+register = template.Library()
+
+
+class TagCacheNode(template.Node):
+    def __init__(self, nodelist, timeout_var, fragment_name, tags_var,
+                 vary_on):
+        self.nodelist = nodelist
+        self.timeout_var = timeout_var
+        self.fragment_name = fragment_name
+        self.tags_var = tags_var
+        self.vary_on = vary_on
+
+    def render(self, context):
+        try:
+            timeout = int(self.timeout_var.resolve(context))
+        except (ValueError, TypeError):
+            raise template.TemplateSyntaxError(
+                f'"tagcache": время жизни должно быть числом, '
+                f'получено {self.timeout_var.var!r}'
+            )
+        tags = self.tags_var.resolve(context) or ()
+        if isinstance(tags, str):
+            tags = tags.split(',')
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        rendered = []
+
+        def render_fragment():
+            value = self.nodelist.render(context)
+            rendered.append(value)
+            # Отложенный потоковый цикл оставляет метку вместо содержимого:
+            # такой фрагмент не сохраняется, а блокировка пересчета
+            # снимается сразу.
+            stream = context.get(CONTEXT_KEY)
+            if stream is not None and stream.contains(value):
+                return None
+            return value
+
+        value = cache_tags.get_or_set(
+            self.fragment_name, tags, render_fragment, vary_on, timeout
+        )
+        return rendered[0] if value is None else value
+
+
+@register.tag('tagcache')
+def do_tagcache(parser, token):
+    """
+    Кэширует фрагмент шаблона до смены версии любого из тегов.
+
+        {% tagcache 3600 index_page cache_tags request.GET.page %}
+            ...
+        {% endtagcache %}
+
+    Теги передаются списком или строкой через запятую.
+    """
+    nodelist = parser.parse(('endtagcache',))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) < 4:
+        raise template.TemplateSyntaxError(
+            f'"{bits[0]}" принимает как минимум три аргумента.'
+        )
+    return TagCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        bits[2],
+        parser.compile_filter(bits[3]),
+        [parser.compile_filter(bit) for bit in bits[4:]],
+    )
@@ -0,0 +1,87 @@
+from django import template
+from django.template.defaulttags import ForNode
+
+from core.streaming import CONTEXT_KEY
+
+register = template.Library()
+
+
+def iter_for(node, context):
+    """ForNode.render по одному элементу, с тем же forloop."""
+    values = node.sequence.resolve(context, ignore_failures=True) or []
+    values = list(values)
+    if not values:
+        yield node.nodelist_empty.render(context)
+        return
+    if node.is_reversed:
+        values.reverse()
+    total = len(values)
+    with context.push():
+        loop = context['forloop'] = {
+            'parentloop': context.get('forloop', {}),
+        }
+        for i, item in enumerate(values):
+            loop.update(
+                counter0=i,
+                counter=i + 1,
+                revcounter=total - i,
+                revcounter0=total - i - 1,
+                first=i == 0,
+                last=i == total - 1
+            )
+            if len(node.loopvars) == 1:
+                context[node.loopvars[0]] = item
+            else:
+                context.update(dict(zip(node.loopvars, item)))
+            yield node.nodelist_loop.render(context)
+            if len(node.loopvars) > 1:
+                context.pop()
+
+
+class StreamNode(template.Node):
+    def __init__(self, nodelist):
+        self.nodelist = nodelist
+
+    def render(self, context):
+        stream = context.get(CONTEXT_KEY)
+        if stream is None:
+            return self.nodelist.render(context)
+        # Шаблон к моменту рендера блока уже отрендерен, поэтому блоку
+        # нужен свой контекст с теми же переменными.
+        values = context.flatten()
+        origin = context.template
+
+        def render_items():
+            block_context = template.Context(
+                values,
+                autoescape=context.autoescape,
+                use_l10n=context.use_l10n,
+                use_tz=context.use_tz
+            )
+            with block_context.bind_template(origin):
+                for node in self.nodelist:
+                    if isinstance(node, ForNode):
+                        yield from iter_for(node, block_context)
+                    else:
+                        yield node.render_annotated(block_context)
+
+        return stream.defer(render_items)
+
+
+@register.tag('stream')
+def do_stream(parser, token):
+    """
+    При потоковом рендере (core.streaming) откладывает блок до отдачи
+    начала страницы, а циклы {% for %} в нем отдает по элементу.
+
+        {% stream %}
+          {% for post in page_obj %}
+            {% include 'includes/card.html' %}
+          {% endfor %}
+        {% endstream %}
+
+    Без потока блок рендерится как обычно.
+    """
+    nodelist = parser.parse(('endstream',))
+    parser.delete_first_token()
+    return StreamNode(nodelist)
@@ -0,0 +1,77 @@
+import gzip
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core import compression
+from core.middleware import CompressionMiddleware
+
+
+class CompressionMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.url = reverse('posts:index')
+
+    def test_page_is_gzipped_once_and_served_from_cache(self):
+        """Сжатая страница берется из кэша страниц без повторного сжатия."""
+        plain = self.client.get(self.url).content
+        with mock.patch.object(
+            compression, 'compress', wraps=compression.compress
+        ) as compress:
+            cache.clear()
+            first = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+            second = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compress.call_count, 1)
+        for response in (first, second):
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertIn('Accept-Encoding', response['Vary'])
+            self.assertEqual(gzip.decompress(response.content), plain)
+
+    def test_without_accept_encoding_body_is_plain(self):
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn(b'<html', response.content)
+
+    def test_uncached_response_is_compressed_only_as_chosen(self):
+        """Вне кэша страниц сжимается только выбранным кодированием."""
+        html = '<p>Пост</p>' * 100
+        middleware = CompressionMiddleware(lambda request: HttpResponse(html))
+        with mock.patch.object(
+            compression, 'compress', wraps=compression.compress
+        ) as compress:
+            middleware(RequestFactory().get('/'))
+            compress.assert_not_called()
+            response = middleware(
+                RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+            )
+        compress.assert_called_once_with(
+            html.encode(), codings=('gzip',)
+        )
+        self.assertEqual(gzip.decompress(response.content).decode(), html)
+
+    @override_settings(COMPRESS_MIN_SIZE=10 ** 6)
+    def test_small_responses_are_not_compressed(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streaming_and_other_types(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        chunks = ['<p>Пост</p>' * 100] * 3
+        response = CompressionMiddleware(
+            lambda request: StreamingHttpResponse(chunks)
+        )(request)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)).decode(),
+            ''.join(chunks)
+        )
+        response = CompressionMiddleware(
+            lambda request: HttpResponse(
+                b'x' * 10000, content_type='image/png'
+            )
+        )(request)
+        self.assertFalse(response.has_header('Content-Encoding'))
@@ -0,0 +1,114 @@
+import shutil
+import tempfile
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from core.sqlite_cache import SQLiteCache
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = f'{self.directory}/cache.sqlite3'
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.path, {'OPTIONS': options})
+
+    def test_tests_do_not_touch_site_cache(self):
+        """cache.clear() в тестах чистит временный файл, а не кэш сайта."""
+        location = settings.CACHES['default']['LOCATION']
+        self.assertTrue(location.startswith(tempfile.gettempdir()))
+        self.assertEqual(caches['default'].path, location)
+
+    def test_values_are_shared_between_instances(self):
+        """Второй экземпляр (другой воркер) видит те же значения."""
+        self.cache.set('key', {'posts': [1, 2]})
+        self.assertEqual(self.make_cache().get('key'), {'posts': [1, 2]})
+        self.make_cache().delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_expired_values_are_missing(self):
+        self.cache.set('key', 'value', timeout=-1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+        self.assertFalse(self.cache.add('key', 'newer'))
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_get_many_and_delete_many(self):
+        self.cache.set_many({'a': 1, 'b': 2, 'c': 3})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'missing']), {'a': 1, 'b': 2}
+        )
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']), {'c': 3})
+
+    def test_large_values_are_compressed(self):
+        value = 'Пост ' * 1000
+        self.cache.set('big', value)
+        self.cache.set('small', 'Пост')
+        rows = dict(self.cache.connection.execute(
+            'SELECT key, compressed FROM cache'
+        ).fetchall())
+        self.assertEqual(rows[self.cache.make_key('big')], 1)
+        self.assertEqual(rows[self.cache.make_key('small')], 0)
+        self.assertEqual(self.cache.get('big'), value)
+
+    def test_least_recently_used_values_are_evicted(self):
+        cache = self.make_cache(MAX_SIZE=3000, COMPRESS_MIN_LENGTH=0)
+        cache.set('old', 'x' * 1000)
+        cache.connection.execute('UPDATE cache SET accessed = 0')
+        cache.set('fresh', 'y' * 1000)
+        cache.set('newest', 'z' * 1000)
+        self.assertIsNone(cache.get('old'))
+        self.assertEqual(cache.get('newest'), 'z' * 1000)
+        total = cache.connection.execute(
+            'SELECT total FROM cache_size'
+        ).fetchone()[0]
+        self.assertLessEqual(total, 3000)
+
+    def test_reads_do_not_write(self):
+        """Отметки обращений копятся в памяти и пишутся одной пачкой."""
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.cache.connection.execute('UPDATE cache SET accessed = 0')
+        changes = self.cache.connection.total_changes
+        for _ in range(3):
+            self.cache.get('a')
+            self.cache.get_many(['b'])
+        self.assertEqual(self.cache.connection.total_changes, changes)
+        self.cache.flush_touches()
+        accessed = self.cache.connection.execute(
+            'SELECT MIN(accessed) FROM cache'
+        ).fetchone()[0]
+        self.assertGreater(accessed, 0)
+
+    def test_writes_cull_expired_rows(self):
+        self.cache.set('old', 'value', timeout=-1)
+        self.cache.set('other', 'value')
+        count = self.cache.connection.execute(
+            'SELECT COUNT(*) FROM cache'
+        ).fetchone()[0]
+        self.assertEqual(count, 1)
+
+    def test_incr_is_atomic(self):
+        self.cache.set('counter', 0)
+
+        def work():
+            cache = self.make_cache()
+            for _ in range(50):
+                cache.incr('counter')
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
@@ -0,0 +1,81 @@
+import gzip
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, override_settings
+
+from core.storage import CompressedManifestStaticFilesStorage
+
+STYLE = 'body { color: #333; }\n' * 100
+
+
+class StaticPipelineTest(SimpleTestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.source, 'css'))
+        with open(os.path.join(self.source, 'css', 'style.css'), 'w') as f:
+            f.write(STYLE)
+        settings = override_settings(
+            STATICFILES_DIRS=[self.source], STATIC_ROOT=self.root
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command('collectstatic', interactive=False, stdout=StringIO())
+        self.hashed = staticfiles_storage.stored_name('css/style.css')
+        self.client = Client()
+
+    def tearDown(self):
+        shutil.rmtree(self.source, ignore_errors=True)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        self.assertRegex(self.hashed, r'^css/style\.[0-9a-f]{12}\.css$')
+        with open(os.path.join(self.root, self.hashed + '.gz'), 'rb') as f:
+            self.assertEqual(gzip.decompress(f.read()).decode(), STYLE)
+
+    def test_precompressed_variant_is_served_immutable(self):
+        url = f'/static/{self.hashed}'
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        body = b''.join(response.streaming_content)
+        self.assertEqual(gzip.decompress(body).decode(), STYLE)
+
+    def test_identity_and_unhashed_names(self):
+        response = self.client.get(
+            f'/static/{self.hashed}', HTTP_ACCEPT_ENCODING='gzip;q=0'
+        )
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content).decode(), STYLE)
+        response = self.client.get('/static/css/style.css')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertEqual(self.client.get('/static/../x').status_code, 404)
+
+    def test_not_modified_keeps_cache_headers(self):
+        """304 несет те же Cache-Control и Vary, что и 200."""
+        for url in (f'/static/{self.hashed}', '/static/css/style.css'):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+                again = self.client.get(
+                    url,
+                    HTTP_ACCEPT_ENCODING='gzip',
+                    HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                )
+                self.assertEqual(again.status_code, 304)
+                for header in ('Cache-Control', 'Vary', 'Last-Modified'):
+                    self.assertEqual(again.get(header), response.get(header))
+                if url.endswith(self.hashed):
+                    self.assertIn('immutable', again['Cache-Control'])
+                    self.assertIn('Accept-Encoding', again['Vary'])
+
+    def test_missing_manifest_entry_falls_back_to_name(self):
+        """Без collectstatic {% static %} дает исходное имя, а не ошибку."""
+        storage = CompressedManifestStaticFilesStorage(location=self.root)
+        self.assertEqual(storage.stored_name('img/new.png'), 'img/new.png')
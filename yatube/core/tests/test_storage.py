@@ -0,0 +1,45 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+from core.storage import INCOMING_DIR, ContentAddressedStorage
+
+
+class ContentAddressedStorageTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_name_is_sharded_content_hash(self):
+        name = self.storage.save('posts/Фото.JPG', ContentFile(b'picture'))
+        digest = hashlib.sha256(b'picture').hexdigest()
+        self.assertEqual(
+            name, f'posts/{digest[:2]}/{digest[2:4]}/{digest}.jpg'
+        )
+        with self.storage.open(name) as saved:
+            self.assertEqual(saved.read(), b'picture')
+
+    def test_same_content_is_stored_once(self):
+        """Повторная загрузка того же файла не создает копию."""
+        first = self.storage.save('posts/a.gif', ContentFile(b'gif'))
+        second = self.storage.save('posts/b.gif', ContentFile(b'gif'))
+        other = self.storage.save('posts/a.gif', ContentFile(b'other'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(
+            os.listdir(self.storage.path(INCOMING_DIR)), []
+        )
+
+    def test_repeated_upload_refreshes_mtime(self):
+        """Новая ссылка на старый файл продлевает ему жизнь для сборщика."""
+        name = self.storage.save('posts/a.gif', ContentFile(b'gif'))
+        os.utime(self.storage.path(name), (0, 0))
+        self.storage.save('posts/b.gif', ContentFile(b'gif'))
+        self.assertGreater(os.path.getmtime(self.storage.path(name)), 0)
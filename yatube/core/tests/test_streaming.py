@@ -0,0 +1,82 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.tiered_cache import TieredCache
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(FEED_STREAMING=True)
+class StreamingFeedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Автор')
+        cls.reader = User.objects.create_user(username='Читатель')
+        cls.group = Group.objects.create(
+            title='Группа', slug='cats', description='Описание'
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Пост номер {i}', author=cls.author, group=cls.group)
+            for i in range(3)
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_head_comes_before_cards(self):
+        """Первый кусок — <head> и шапка, карточки идут отдельно."""
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:follow_index'),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.streaming)
+                self.assertEqual(len(response.context['page_obj']), 3)
+                chunks = [
+                    chunk.decode() for chunk in response.streaming_content
+                ]
+                self.assertIn('<head>', chunks[0])
+                self.assertNotIn('Пост номер', chunks[0])
+                cards = [chunk for chunk in chunks if 'Пост номер' in chunk]
+                self.assertEqual(len(cards), 3)
+                html = ''.join(chunks)
+                self.assertNotIn('<!--stream:', html)
+                self.assertIn('</html>', html)
+
+    def test_streamed_page_matches_plain_render(self):
+        url = reverse('posts:index')
+        streamed = b''.join(self.client.get(url).streaming_content)
+        cache.clear()
+        with self.settings(FEED_STREAMING=False):
+            plain = self.client.get(url).content
+        self.assertEqual(streamed, plain)
+
+    def test_fragment_cache_does_not_keep_markers(self):
+        url = reverse('posts:index')
+        b''.join(self.client.get(url).streaming_content)
+        anonymous = Client().get(url)
+        self.assertFalse(anonymous.streaming)
+        self.assertContains(anonymous, 'Пост номер 2')
+        self.assertNotContains(anonymous, '<!--stream:')
+
+    @override_settings(TAGGED_CACHE='tiered')
+    def test_streamed_fragment_leaves_no_recompute_lock(self):
+        """Несохраненный фрагмент не держит блокировку тирового кэша."""
+        url = reverse('posts:index')
+        with mock.patch.object(
+            TieredCache, 'wait_for', side_effect=AssertionError('ожидание')
+        ):
+            for _ in range(2):
+                html = b''.join(self.client.get(url).streaming_content)
+                self.assertIn('Пост номер 2'.encode(), html)
@@ -0,0 +1,100 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from core.tiered_cache import Entry, TieredCache
+
+
+class TieredCacheTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.cache = self.make_cache('first')
+
+    def make_cache(self, name, **options):
+        options.setdefault('WAIT_TIMEOUT', 2)
+        tiered = TieredCache(f'tiered-test-{name}', {'OPTIONS': options})
+        tiered.l1.clear()
+        return tiered
+
+    def test_value_is_served_from_process_memory(self):
+        """После записи значение читается из L1 без обращения к L2."""
+        self.cache.set('key', 'value')
+        cache.clear()
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertIsNone(self.make_cache('second').get('key'))
+
+    def test_only_one_worker_recomputes_missing_key(self):
+        """Второй воркер ждет значение, пока первый его считает."""
+        other = self.make_cache('second')
+        computing = threading.Event()
+        result = {}
+
+        def compute():
+            computing.set()
+            time.sleep(0.1)
+            return 'value'
+
+        def slow_worker():
+            result['first'] = self.cache.get_or_set('key', compute)
+
+        worker = threading.Thread(target=slow_worker)
+        worker.start()
+        computing.wait()
+        result['second'] = other.get_or_set(
+            'key', lambda: self.fail('пересчет во втором воркере')
+        )
+        worker.join()
+        self.assertEqual(result, {'first': 'value', 'second': 'value'})
+
+    def test_hot_key_is_refreshed_early_by_one_caller(self):
+        """Почти истекший ключ пересчитывает только один запрос."""
+        self.cache.l2.set(
+            self.cache.make_key('key'),
+            Entry('value', 10, time.time() + 1)
+        )
+        with mock.patch('core.tiered_cache.random.random', return_value=0.5):
+            self.assertEqual(
+                self.cache.get_or_set('key', lambda: 'new'), 'new'
+            )
+            self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_plain_reads_take_no_locks(self):
+        """get() и get_many() по промаху ничего не блокируют."""
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.set('other', 'value')
+        self.assertEqual(
+            self.cache.get_many(['key', 'other']), {'other': 'value'}
+        )
+        self.assertFalse(cache.has_key(self.cache.lock_key(
+            self.cache.make_key('key')
+        )))
+        self.assertEqual(
+            self.make_cache('second').get_or_set('key', 'computed'),
+            'computed'
+        )
+
+    def test_lock_is_released_when_nothing_is_stored(self):
+        self.assertIsNone(self.cache.get_or_set('key', lambda: None))
+        self.assertFalse(cache.has_key(self.cache.lock_key(
+            self.cache.make_key('key')
+        )))
+        with self.assertRaises(ValueError):
+            self.cache.get_or_set('key', lambda: int('ошибка'))
+        self.assertFalse(cache.has_key(self.cache.lock_key(
+            self.cache.make_key('key')
+        )))
+
+    def test_get_or_set_computes_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return 'result'
+
+        for _ in range(3):
+            value = self.cache.get_or_set('key', compute)
+        self.assertEqual(value, 'result')
+        self.assertEqual(len(calls), 1)
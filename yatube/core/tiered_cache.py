@@ -0,0 +1,174 @@
+"""
+Двухуровневый кэш с защитой от лавинного пересчета.
+
+L1 — память процесса (LocMemCache с коротким сроком), L2 — общий кэш
+из CACHES (по умолчанию 'default'). Пересчет идет через get_or_set(): по
+промаху его делает только один процесс, взявший блокировку в L2,
+остальные ждут его результата до WAIT_TIMEOUT секунд. Горячие ключи
+обновляются заранее по алгоритму XFetch: чем ближе срок и чем дольше
+считалось значение, тем вероятнее, что очередной get_or_set()
+пересчитает его одним запросом, пока остальные получают еще живое
+значение. Обычные get() и get_many() только читают и ничего не
+блокируют, поэтому {% cache ... using="tiered" %} получает лишь L1.
+
+    CACHES['tiered'] = {
+        'BACKEND': 'core.tiered_cache.TieredCache',
+        'OPTIONS': {'L2': 'default', 'L1_TIMEOUT': 5, 'BETA': 1.0},
+    }
+
+Удаление ключа сбрасывает L1 только в текущем процессе, остальные
+увидят его не позже чем через L1_TIMEOUT секунд.
+"""
+import math
+import random
+import time
+from collections import namedtuple
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+Entry = namedtuple('Entry', 'value delta expires')
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.l2_alias = options.get('L2', 'default')
+        self.l1_timeout = options.get('L1_TIMEOUT', 5)
+        self.beta = options.get('BETA', 1.0)
+        self.lock_timeout = options.get('LOCK_TIMEOUT', 10)
+        self.wait_timeout = options.get('WAIT_TIMEOUT', 0.5)
+        self.poll_interval = options.get('POLL_INTERVAL', 0.02)
+        self.l1 = LocMemCache(location or 'tiered', {
+            'TIMEOUT': self.l1_timeout,
+            'OPTIONS': {'MAX_ENTRIES': options.get('L1_MAX_ENTRIES', 1000)},
+        })
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    def lock_key(self, key):
+        return f'{key}:lock'
+
+    def expired_early(self, entry, now):
+        if entry.expires is None:
+            return False
+        return (
+            now - entry.delta * self.beta * math.log(random.random() or 1e-12)
+            >= entry.expires
+        )
+
+    def claim(self, key):
+        return self.l2.add(self.lock_key(key), True, self.lock_timeout)
+
+    def release(self, key):
+        self.l2.delete(self.lock_key(key))
+
+    def wait_for(self, key):
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            entry = self.l2.get(key)
+            if entry is not None:
+                return entry
+        return None
+
+    def lookup(self, key):
+        """Запись из L1, иначе из L2 с копией в L1; без блокировок."""
+        entry = self.l1.get(key)
+        if entry is None:
+            entry = self.l2.get(key)
+            if entry is not None:
+                self.l1.set(key, entry)
+        return entry
+
+    def store(self, key, value, timeout, delta=0):
+        expires = self.get_backend_timeout(timeout)
+        entry = Entry(value, delta, expires)
+        self.l2.set(key, entry, timeout)
+        l1_timeout = self.l1_timeout
+        if expires is not None:
+            l1_timeout = max(min(l1_timeout, expires - time.time()), 0)
+        self.l1.set(key, entry, l1_timeout)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        entry = self.lookup(key)
+        return default if entry is None else entry.value
+
+    def get_many(self, keys, version=None):
+        """L1, затем одно обращение к L2 за всеми промахами."""
+        made = {self.make_key(key, version=version): key for key in keys}
+        for key in made:
+            self.validate_key(key)
+        entries = self.l1.get_many(made)
+        missing = [key for key in made if key not in entries]
+        if missing:
+            found = self.l2.get_many(missing)
+            for key, entry in found.items():
+                self.l1.set(key, entry)
+            entries.update(found)
+        return {made[key]: entry.value for key, entry in entries.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self.store(key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if self.has_key(key, version=version):
+            return False
+        self.set(key, value, timeout, version=version)
+        return True
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        Значение ключа или результат default, посчитанный одним воркером.
+
+        Пересчет берет блокировку в L2: остальные ждут его результата,
+        а почти истекший ключ пересчитывается заранее, пока остальным
+        отдается старое значение. Если default вернул None, значение не
+        сохраняется, а блокировка снимается.
+        """
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        entry = self.lookup(key)
+        if entry is not None and not (
+            self.expired_early(entry, time.time()) and self.claim(key)
+        ):
+            return entry.value
+        if entry is None and not self.claim(key):
+            entry = self.wait_for(key)
+            if entry is not None:
+                self.l1.set(key, entry)
+                return entry.value
+            # Не дождались: считаем сами, но блокировку не трогаем.
+            return self.compute(key, default, timeout)
+        try:
+            return self.compute(key, default, timeout)
+        finally:
+            self.release(key)
+
+    def compute(self, key, default, timeout):
+        started = time.monotonic()
+        value = default() if callable(default) else default
+        if value is not None:
+            self.store(key, value, timeout, time.monotonic() - started)
+        return value
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        return self.l1.has_key(key) or self.l2.has_key(key)
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.l1.delete(key)
+        self.l2.delete(key)
+
+    def clear(self):
+        self.l1.clear()
+        self.l2.clear()
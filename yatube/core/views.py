@@ -1,6 +1,25 @@
 # core/views.py
+import mimetypes
+import os
+import posixpath
+import re
 from http.client import FORBIDDEN, INTERNAL_SERVER_ERROR, NOT_FOUND
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponseNotModified
 from django.shortcuts import render
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from . import compression
+from .http import choose_encoding
+
+# Имя, в которое collectstatic дописал хэш: css/style.0123456789ab.css.
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
 
 
 def page_not_found(request, exception):
@@ -17,3 +36,58 @@ def permission_denied(request, exception):
 
 def server_error(request):
     return render(request, 'core/500.html', status=INTERNAL_SERVER_ERROR)
+
+
+def set_cache_headers(response, path, content_type, variants):
+    """Одинаковые для 200 и 304: иначе 304 сбросит их в кэше клиента."""
+    # Без заранее сжатых файлов 200 сжимает CompressionMiddleware.
+    if variants or content_type in settings.COMPRESS_CONTENT_TYPES:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    if HASHED_NAME_RE.search(path):
+        response['Cache-Control'] = IMMUTABLE
+    else:
+        response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def serve_static(request, path):
+    """
+    Файл из STATIC_ROOT, сжатый заранее, если клиент это принимает.
+
+    Имена с хэшем содержимого не меняются никогда, поэтому кэшируются
+    навсегда; остальные браузер перепроверяет по Last-Modified.
+    """
+    try:
+        full_path = safe_join(
+            settings.STATIC_ROOT, posixpath.normpath(path).lstrip('/')
+        )
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    stat = os.stat(full_path)
+    variants = [
+        coding for coding, suffix in compression.SUFFIXES.items()
+        if os.path.isfile(full_path + suffix)
+    ]
+    content_type, _ = mimetypes.guess_type(full_path)
+    if not was_modified_since(
+        request.META.get('HTTP_IF_MODIFIED_SINCE'),
+        stat.st_mtime,
+        stat.st_size
+    ):
+        response = HttpResponseNotModified()
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        return set_cache_headers(response, path, content_type, variants)
+    encoding = choose_encoding(request, variants)
+    served = full_path
+    if encoding:
+        served += compression.SUFFIXES[encoding]
+    response = FileResponse(
+        open(served, 'rb'),
+        content_type=content_type or 'application/octet-stream'
+    )
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return set_cache_headers(response, path, content_type, variants)
@@ -1,14 +1,88 @@
+from functools import partial
+
 from django.contrib import admin
+from django.contrib.admin.widgets import ForeignKeyRawIdWidget
+from django.db import models
+from django.utils import timezone
+
+from core import cache_tags
+
+from . import changelog, conditional, search
+from .caching import FEED_INDEX, author_tag, group_tag
+from .models import Change, Comment, Follow, Post, Group
+from .paginators import EstimatedCountPaginator
+
+
+class IdOnlyRawIdWidget(ForeignKeyRawIdWidget):
+    """Поле id без подписи: подпись стоила бы запроса на каждую строку."""
+
+    def label_and_url_for_value(self, value):
+        return '', ''
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Общие настройки списков для таблиц в миллионы строк.
+
+    Число строк оценивается по статистике, а общий COUNT(*) без фильтров
+    рядом с отфильтрованным списком не считается. Внешние ключи из
+    list_editable редактируются по id, без выпадающего списка всех строк.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
 
-from .models import Comment, Follow, Post, Group
+    def get_changelist_formset(self, request, **kwargs):
+        kwargs.setdefault(
+            'formfield_callback',
+            partial(self.changelist_formfield, request=request)
+        )
+        return super().get_changelist_formset(request, **kwargs)
 
+    def changelist_formfield(self, db_field, request, **kwargs):
+        if isinstance(db_field, models.ForeignKey):
+            kwargs['widget'] = IdOnlyRawIdWidget(
+                db_field.remote_field, self.admin_site
+            )
+        return self.formfield_for_dbfield(db_field, request, **kwargs)
 
-class PostAdmin(admin.ModelAdmin):
+
+class PostAdmin(LargeTableAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group', 'image',)
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
-    empty_value_display = '-пусто-'
+    date_hierarchy = 'pub_date'
+    actions = ('remove_from_group',)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Вместо LIKE '%...%' по всей таблице — полнотекстовый индекс.
+        if not search_term:
+            return queryset, False
+        return search.filter_posts(queryset, search_term), False
+
+    def remove_from_group(self, request, queryset):
+        # update() не шлет сигналов, поэтому кэш сбрасывается здесь.
+        slugs = set(
+            queryset.exclude(group=None)
+            .values_list('group__slug', flat=True).distinct()
+        )
+        rows = list(queryset.values_list('pk', 'author_id'))
+        author_ids = {author_id for _, author_id in rows}
+        now = timezone.now()
+        Group.objects.filter(slug__in=slugs).update(updated_at=now)
+        conditional.touch(author_ids)
+        updated = queryset.update(group=None, updated_at=now)
+        changelog.record_many(Change.POST, Change.UPDATED, rows)
+        cache_tags.invalidate_on_commit(
+            FEED_INDEX,
+            *(group_tag(slug) for slug in slugs),
+            *(author_tag(author_id) for author_id in author_ids)
+        )
+        self.message_user(request, f'Убрано из групп постов: {updated}')
+    remove_from_group.short_description = 'Убрать из группы'
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -19,23 +93,39 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = ('pk', 'post', 'author', 'text', 'pub_date',)
     list_editable = ('post',)
+    list_select_related = ('post__author', 'author')
+    raw_id_fields = ('post', 'author')
     search_fields = ('text',)
     list_filter = ('pub_date',)
-    empty_value_display = '-пусто-'
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     list_display = ('user', 'author',)
     list_editable = ('author',)
-    search_fields = ('author',)
-    list_filter = ('author',)
-    empty_value_display = '-пусто-'
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+    # Точное совпадение имени идет по уникальному индексу auth_user.
+    search_fields = ('=author__username', '=user__username')
+
+
+class ChangeAdmin(LargeTableAdmin):
+    """Журнал только для просмотра: его пишут сигналы."""
+    list_display = ('pk', 'kind', 'action', 'object_id', 'owner_id',
+                    'created',)
+    list_filter = ('kind', 'action',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(Change, ChangeAdmin)
@@ -0,0 +1,18 @@
+"""Теги кэша для постов, авторов, групп и лент."""
+FEED_INDEX = 'feed:index'
+
+
+def post_tag(post_id):
+    return f'post:{post_id}'
+
+
+def author_tag(user_id):
+    return f'author:{user_id}'
+
+
+def group_tag(slug):
+    return f'group:{slug}'
+
+
+def page_tags(page_obj, *tags):
+    return [*tags, *(post_tag(post.pk) for post in page_obj)]
@@ -0,0 +1,94 @@
+"""
+Журнал изменений постов, комментариев и подписок для синхронизации.
+
+Сигналы дописывают по строке на каждое создание, правку и удаление, а
+/api/v1/sync/ отдает клиенту изменения его ленты после токена, не
+заставляя заново скачивать ленты целиком. Токен — id последней
+отданной записи; в SQLite записи идут по одной, поэтому id растут в
+порядке фиксации транзакций.
+"""
+import re
+
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from .models import Change, Follow, Post
+
+TOKEN_PREFIX = 'c'
+# Только ASCII-цифры и не больше 18 знаков: id влезает в BIGINT.
+TOKEN_RE = re.compile(rf'^{TOKEN_PREFIX}([0-9]{{1,18}})$')
+
+
+def record(kind, action, object_id, owner_id):
+    Change.objects.create(
+        kind=kind, action=action, object_id=object_id, owner_id=owner_id
+    )
+
+
+def record_many(kind, action, rows):
+    """Одна вставка на пачку: rows — пары (object_id, owner_id)."""
+    Change.objects.bulk_create(
+        Change(kind=kind, action=action, object_id=object_id,
+               owner_id=owner_id)
+        for object_id, owner_id in rows
+    )
+
+
+def post_updated(post_id):
+    """Правка поста мимо save(): update() сигналов не шлет."""
+    author_id = Post.objects.filter(pk=post_id).values_list(
+        'author_id', flat=True
+    ).first()
+    if author_id is not None:
+        record(Change.POST, Change.UPDATED, post_id, author_id)
+
+
+def encode_token(change_id):
+    return urlsafe_base64_encode(f'{TOKEN_PREFIX}{change_id}'.encode())
+
+
+def decode_token(token):
+    """id записи из токена или None, если токен испорчен."""
+    try:
+        raw = urlsafe_base64_decode(token).decode()
+    except (ValueError, UnicodeDecodeError):
+        return None
+    match = TOKEN_RE.match(raw)
+    return int(match.group(1)) if match else None
+
+
+def latest_token():
+    last = Change.objects.order_by('-id').values_list('id', flat=True)
+    return encode_token(last.first() or 0)
+
+
+def changes_for(user, since, limit):
+    """
+    Изменения в ленте user после записи since, не больше limit.
+
+    Ленту составляют свои посты и подписки и посты авторов, на которых
+    user подписан, с комментариями к ним. Повторы одного объекта
+    схлопываются в последнее действие. Возвращает (изменения, id
+    последней прочитанной записи, есть ли еще).
+    """
+    owners = [
+        user.pk,
+        *Follow.objects.filter(user=user).values_list('author_id', flat=True)
+    ]
+    rows = list(
+        Change.objects.filter(owner_id__in=owners, id__gt=since)
+        .order_by('id')
+        .values_list('id', 'kind', 'action', 'object_id')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    last = {}
+    for change_id, kind, action, object_id in rows:
+        key = kind, object_id
+        # Созданный и тут же измененный объект для клиента все еще новый.
+        if action == Change.UPDATED and last.get(key, {}).get(
+            'action'
+        ) == Change.CREATED:
+            action = Change.CREATED
+        last.pop(key, None)
+        last[key] = {'type': kind, 'action': action, 'id': object_id}
+    return list(last.values()), rows[-1][0] if rows else since, has_more
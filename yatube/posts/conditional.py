@@ -0,0 +1,168 @@
+"""
+Условные GET-запросы (ETag и Last-Modified) для лент и страниц постов.
+
+Для каждой страницы одним дешевым запросом берется время последнего
+изменения того, что на ней видно: для главной — MAX(updated_at) постов
+по индексу, для группы, профиля и поста — updated_at их строк. ETag
+строится из него, версий тегов кэша страницы, адреса с параметрами и
+пользователя. Версии тегов меняются при любой
+записи, в том числе при удалении, которого не видно по updated_at.
+
+MAX(updated_at) не замечает удаления, поэтому удаление поста отмечается
+отдельно: для профиля — в updated_at статистики автора (счетчик постов),
+для групп — в updated_at группы, а для главной — отметкой времени в
+кэше (touch_index). Вытесненная отметка возвращается как «сейчас», что
+только делает страницу новее.
+
+Ленты групп, профилей и подписок не перебирают посты: любая правка
+поста, в том числе мимо save() (комментарии, миниатюры), сдвигает
+updated_at статистики его автора и его группы (touch, touch_posts), и
+Last-Modified ленты читается из одной строки, а для подписок — MAX по
+строкам статистики авторов и читателя.
+
+Если клиент прислал совпадающий If-None-Match (или If-Modified-Since,
+когда ETag нет), ответ 304 уходит до основных запросов вьюхи и до
+рендера шаблона.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from core import cache_tags
+
+from .caching import FEED_INDEX, author_tag, group_tag, post_tag
+from .models import Follow, Group, Post, UserStats
+
+STATE_ATTR = '_conditional_state'
+INDEX_CHANGED_KEY = 'conditional:index:changed'
+
+
+def latest(*dates):
+    dates = [date for date in dates if date is not None]
+    return max(dates) if dates else None
+
+
+def touch_index():
+    """Главная изменилась так, что MAX(updated_at) этого не покажет."""
+    cache.set(INDEX_CHANGED_KEY, timezone.now(), None)
+
+
+def touch(author_ids=(), group_ids=()):
+    """Сдвигает updated_at статистики авторов и групп на «сейчас»."""
+    now = timezone.now()
+    if author_ids:
+        UserStats.objects.filter(user_id__in=author_ids).update(
+            updated_at=now
+        )
+    if group_ids:
+        Group.objects.filter(pk__in=group_ids).update(updated_at=now)
+
+
+def touch_posts(posts):
+    """touch для авторов и групп постов, измененных через update()."""
+    rows = list(posts.values_list('author_id', 'group_id'))
+    touch(
+        {author_id for author_id, _ in rows},
+        {group_id for _, group_id in rows if group_id is not None}
+    )
+
+
+def index_changed():
+    changed = cache.get(INDEX_CHANGED_KEY)
+    if changed is None:
+        cache.add(INDEX_CHANGED_KEY, timezone.now(), None)
+        changed = cache.get(INDEX_CHANGED_KEY)
+    return changed
+
+
+def index_state(request):
+    last = Post.objects.aggregate(last=Max('updated_at'))['last']
+    return latest(last, index_changed()), [FEED_INDEX]
+
+
+def group_state(request, slug):
+    last = Group.objects.filter(slug=slug).values_list(
+        'updated_at', flat=True
+    ).first()
+    if last is None:
+        return None
+    return last, [group_tag(slug)]
+
+
+def profile_state(request, username):
+    row = UserStats.objects.filter(user__username=username).values_list(
+        'user_id', 'updated_at'
+    ).first()
+    if row is None:
+        return None
+    user_id, last = row
+    return last, [author_tag(user_id)]
+
+
+def post_state(request, post_id):
+    row = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'updated_at', 'group__updated_at',
+        'author__stats__updated_at'
+    ).first()
+    if row is None:
+        return None
+    author_id, *dates = row
+    return latest(*dates), [post_tag(post_id), author_tag(author_id)]
+
+
+def follow_state(request):
+    """
+    Лента подписок: статистика авторов, которую сдвигают публикации,
+    правки и удаления их постов, плюс своя — подписки и отписки.
+    """
+    if not request.user.is_authenticated:
+        return None
+    followed = Follow.objects.filter(user=request.user).values('author')
+    last = UserStats.objects.filter(
+        Q(user__in=followed) | Q(user=request.user)
+    ).aggregate(last=Max('updated_at'))['last']
+    return last, [author_tag(request.user.pk)]
+
+
+def make_etag(request, last_modified, tags):
+    versions = cache_tags.tag_versions(tags)
+    parts = [
+        request.get_full_path(),
+        str(request.user.pk),
+        last_modified.isoformat() if last_modified else '',
+        *(f'{tag}={versions[tag]}' for tag in sorted(versions)),
+    ]
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def conditional_page(get_state):
+    """
+    condition() с валидаторами из get_state(request, *args, **kwargs).
+
+    get_state возвращает (время последнего изменения, теги) или None,
+    если страницы нет, — тогда решает сама вьюха. Запрос за состоянием
+    выполняется один раз на оба валидатора.
+    """
+    def state(request, *args, **kwargs):
+        if not hasattr(request, STATE_ATTR):
+            found = get_state(request, *args, **kwargs)
+            if found is not None:
+                last_modified, tags = found
+                found = (
+                    last_modified, make_etag(request, last_modified, tags)
+                )
+            setattr(request, STATE_ATTR, found)
+        return getattr(request, STATE_ATTR)
+
+    def etag(request, *args, **kwargs):
+        found = state(request, *args, **kwargs)
+        return found and found[1]
+
+    def last_modified(request, *args, **kwargs):
+        found = state(request, *args, **kwargs)
+        return found and found[0]
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
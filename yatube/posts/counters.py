@@ -0,0 +1,93 @@
+"""
+Денормализованные счетчики постов, подписчиков, подписок и комментариев.
+
+Счетчики меняются через F() в том же запросе, что и сама запись, а
+при отсутствии строки статистики пересчитываются целиком по базе.
+Вместе со счетчиком обновляется updated_at строки — по нему считается
+Last-Modified страниц (posts.conditional).
+"""
+from django.db.models import Count, F
+from django.utils import timezone
+
+from . import conditional
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def count_by(queryset, field, ids):
+    return dict(
+        queryset.filter(**{f'{field}__in': ids})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values_list(field, 'total')
+    )
+
+
+def rebuild_users(user_ids):
+    user_ids = list(user_ids)
+    posts = count_by(Post.objects, 'author', user_ids)
+    followers = count_by(Follow.objects, 'author', user_ids)
+    following = count_by(Follow.objects, 'user', user_ids)
+    stats = [
+        UserStats(
+            user_id=user_id,
+            posts_count=posts.get(user_id, 0),
+            followers_count=followers.get(user_id, 0),
+            following_count=following.get(user_id, 0),
+        )
+        for user_id in user_ids
+    ]
+    existing = set(
+        UserStats.objects.filter(user_id__in=user_ids)
+        .values_list('user_id', flat=True)
+    )
+    UserStats.objects.bulk_create(
+        [row for row in stats if row.user_id not in existing],
+        ignore_conflicts=True,
+    )
+    UserStats.objects.bulk_update(
+        [row for row in stats if row.user_id in existing],
+        ['posts_count', 'followers_count', 'following_count'],
+    )
+    return stats
+
+
+def rebuild_posts(post_ids):
+    post_ids = list(post_ids)
+    comments = count_by(Comment.objects, 'post', post_ids)
+    Post.objects.bulk_update(
+        [
+            Post(pk=post_id, comments_count=comments.get(post_id, 0))
+            for post_id in post_ids
+        ],
+        ['comments_count'],
+    )
+
+
+def change_user(user_id, field, delta):
+    stats = UserStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        stats = stats.filter(**{f'{field}__gte': -delta})
+    updated = stats.update(
+        **{field: F(field) + delta}, updated_at=timezone.now()
+    )
+    if not updated and delta > 0 and User.objects.filter(pk=user_id).exists():
+        rebuild_users([user_id])
+
+
+def change_comments(post_id, delta):
+    posts = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        posts = posts.filter(comments_count__gte=-delta)
+    if posts.update(
+        comments_count=F('comments_count') + delta,
+        updated_at=timezone.now()
+    ):
+        conditional.touch_posts(posts)
+
+
+def get_stats(user):
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return rebuild_users([user.pk])[0]
@@ -0,0 +1,144 @@
+"""
+Лента из кольцевых буферов последних постов каждого автора.
+
+В кэше для каждого автора хранится не больше RECENT_POSTS_BUFFER пар
+(pub_date, id) его последних постов. Страница ленты собирается слиянием
+буферов через кучу и одним in_bulk, без соединения Post и Follow.
+Если буферов не хватает, чтобы честно собрать страницу, запрос уходит
+в обычную выборку по базе.
+
+Ключ буфера содержит поколение автора — версию тега из core.cache_tags.
+Новый или удаленный пост сдвигает поколение (сразу и после коммита), и
+буфер, собранный параллельным запросом из старых строк, ложится под
+старый ключ, который больше никто не читает.
+"""
+import heapq
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import cache_tags
+
+from .models import Post
+from .paginators import CursorPaginator
+
+BUFFER_KEY = 'posts:recent:{}:{}'
+GENERATION_TAG = 'recent:{}'
+BUFFER_TIMEOUT = 60 * 60 * 24
+# Сколько недостающих буферов можно собрать из базы за один запрос.
+MAX_COLD_BUFFERS = 20
+
+
+def generation_tag(author_id):
+    return GENERATION_TAG.format(author_id)
+
+
+def buffer_keys(author_ids):
+    """Ключи буферов текущих поколений: {ключ: id автора}."""
+    tags = {generation_tag(author_id): author_id for author_id in author_ids}
+    versions = cache_tags.tag_versions(tags)
+    return {
+        BUFFER_KEY.format(tags[tag], version): tags[tag]
+        for tag, version in versions.items()
+    }
+
+
+def buffer_key(author_id):
+    [key] = buffer_keys([author_id])
+    return key
+
+
+def build_buffer(author_id):
+    size = settings.RECENT_POSTS_BUFFER
+    items = list(
+        Post.objects.filter(author_id=author_id)
+        .order_by('-pub_date', '-id')
+        .values_list('pub_date', 'id')[:size + 1]
+    )
+    return {'items': items[:size], 'complete': len(items) <= size}
+
+
+def load_buffers(author_ids):
+    """Возвращает буферы авторов или None, если холодных слишком много."""
+    # Поколения читаются до сборки: буфер ляжет под ключ того поколения,
+    # при котором его начали собирать.
+    keys = buffer_keys(author_ids)
+    buffers = {
+        keys[key]: buffer for key, buffer in cache.get_many(keys).items()
+    }
+    missing = [key for key, author_id in keys.items()
+               if author_id not in buffers]
+    if len(missing) > MAX_COLD_BUFFERS:
+        return None
+    built = {key: build_buffer(keys[key]) for key in missing}
+    if built:
+        cache.set_many(built, BUFFER_TIMEOUT)
+        buffers.update((keys[key], buffer) for key, buffer in built.items())
+    return buffers
+
+
+def discard(author_id):
+    """
+    Сбрасывает буфер автора после нового или удаленного поста.
+
+    Буфер не дописывается на месте: чтение и запись без блокировки
+    теряли бы посты параллельных запросов, а новый буфер соберет
+    первое чтение уже под новым поколением.
+    """
+    old_key = buffer_key(author_id)
+    cache_tags.invalidate_on_commit(generation_tag(author_id))
+    cache.delete(old_key)
+
+
+class FanInPaginator(CursorPaginator):
+    def __init__(self, object_list, per_page, author_ids):
+        super().__init__(object_list, per_page)
+        self.author_ids = list(author_ids)
+
+    def fetch(self, anchor, backwards, limit):
+        rows = self.fetch_from_buffers(anchor, backwards, limit)
+        if rows is None:
+            return super().fetch(anchor, backwards, limit)
+        return rows
+
+    def fetch_from_buffers(self, anchor, backwards, limit):
+        buffers = load_buffers(self.author_ids)
+        if buffers is None:
+            return None
+        # Самый свежий из «хвостов» неполных буферов: новее него в буферах
+        # есть все посты, старше — уже не обязательно.
+        horizon = max(
+            (buffer['items'][-1] for buffer in buffers.values()
+             if not buffer['complete']),
+            default=None
+        )
+        newest_first = self.descending != backwards
+        if newest_first:
+            keys = heapq.merge(
+                *(buffer['items'] for buffer in buffers.values()),
+                reverse=True
+            )
+            keys = [key for key in keys
+                    if (anchor is None or key < anchor)
+                    and (horizon is None or key >= horizon)][:limit]
+            if len(keys) < limit and horizon is not None:
+                return None
+        else:
+            if horizon is not None and (anchor is None or anchor < horizon):
+                return None
+            keys = heapq.merge(
+                *(reversed(buffer['items']) for buffer in buffers.values())
+            )
+            keys = [key for key in keys
+                    if anchor is None or key > anchor][:limit]
+        posts = self.object_list.in_bulk([pk for pub_date, pk in keys])
+        stale = {
+            pk for pub_date, pk in keys
+            if pk not in posts or posts[pk].pub_date != pub_date
+        }
+        if stale:
+            for author_id, buffer in buffers.items():
+                if any(pk in stale for pub_date, pk in buffer['items']):
+                    discard(author_id)
+            return None
+        return [posts[pk] for pub_date, pk in keys]
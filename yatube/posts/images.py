@@ -0,0 +1,86 @@
+"""
+Приведение загруженных картинок постов к виду для показа.
+
+Выполняется в пуле потоков миниатюр до их нарезки, а не в запросе:
+картинка поворачивается по тегу Orientation, EXIF выбрасывается, а слишком
+большие снимки уменьшаются до IMAGE_MAX_SIZE и пережимаются. Результат
+сохраняется в то же хранилище с адресацией по содержимому, и пост
+переключается на новый файл. Оригинал не удаляется сразу: тот же файл
+может быть у поста, который еще не зафиксирован, — сироты убирает
+команда delete_orphan_images.
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import changelog, conditional
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Анимированные GIF и прочие форматы не трогаются.
+FORMATS = ('JPEG', 'PNG', 'WEBP')
+
+
+def save_options(image_format):
+    """Параметры Image.save() для формата; настройки читаются при вызове."""
+    return {
+        'JPEG': {'quality': settings.IMAGE_QUALITY, 'optimize': True},
+        'PNG': {'optimize': True},
+        'WEBP': {'quality': settings.IMAGE_QUALITY},
+    }[image_format]
+
+
+def get_storage():
+    return Post._meta.get_field('image').storage
+
+
+def needs_normalizing(image):
+    if image.format not in FORMATS:
+        return False
+    return bool(image.getexif()) or max(image.size) > settings.IMAGE_MAX_SIZE
+
+
+def encode(image):
+    """Картинка без EXIF, повернутая и уменьшенная, в исходном формате."""
+    image_format = image.format
+    image = ImageOps.exif_transpose(image)
+    limit = settings.IMAGE_MAX_SIZE
+    image.thumbnail((limit, limit), Image.LANCZOS)
+    output = BytesIO()
+    image.save(
+        output, format=image_format, exif=b'', **save_options(image_format)
+    )
+    return output.getvalue()
+
+
+def normalize(post_id, image_name):
+    """Возвращает имя картинки, которое теперь у поста, или None."""
+    storage = get_storage()
+    try:
+        with storage.open(image_name) as source:
+            image = Image.open(source)
+            if not needs_normalizing(image):
+                return image_name
+            data = encode(image)
+    except Exception:
+        logger.exception('Не удалось обработать %s', image_name)
+        return image_name
+    field = Post._meta.get_field('image')
+    name = storage.save(
+        field.generate_filename(None, os.path.basename(image_name)),
+        ContentFile(data)
+    )
+    # Пока шла обработка, картинку поста могли заменить или удалить.
+    if not Post.objects.filter(pk=post_id, image=image_name).update(
+        image=name, updated_at=timezone.now()
+    ):
+        return None
+    conditional.touch_posts(Post.objects.filter(pk=post_id))
+    changelog.post_updated(post_id)
+    return name
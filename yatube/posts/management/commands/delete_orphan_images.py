@@ -0,0 +1,73 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.storage import INCOMING_DIR
+from posts.models import Post
+
+
+def walk_files(storage, directory):
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield f'{directory}/{name}' if directory else name
+    for name in directories:
+        if name != INCOMING_DIR:
+            yield from walk_files(
+                storage, f'{directory}/{name}' if directory else name
+            )
+
+
+def chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки постов, на которые не ссылается ни один пост и '
+        'которые не менялись дольше --min-age секунд'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=60 * 60 * 24,
+            help='Сколько секунд файл должен пролежать без изменений',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, что было бы удалено',
+        )
+
+    def handle(self, *args, **options):
+        field = Post._meta.get_field('image')
+        storage = field.storage
+        directory = field.upload_to.rstrip('/')
+        if not storage.exists(directory):
+            return
+        # Свежие файлы могут принадлежать еще не зафиксированным постам.
+        deadline = time.time() - options['min_age']
+        deleted = 0
+        for names in chunks(walk_files(storage, directory), 500):
+            used = set(
+                Post.objects.filter(image__in=names)
+                .values_list('image', flat=True)
+            )
+            for name in names:
+                if name in used:
+                    continue
+                if os.path.getmtime(storage.path(name)) > deadline:
+                    continue
+                if not options['dry_run']:
+                    storage.delete(name)
+                deleted += 1
+        self.stdout.write(f'Удалено файлов: {deleted}')
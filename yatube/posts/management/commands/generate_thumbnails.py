@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Нарезает недостающие миниатюры: для картинок, загруженных до '
+        'появления нарезки или новых размеров, и после неудачных попыток'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Сколько постов проверять за раз',
+        )
+
+    def handle(self, *args, **options):
+        size = options['chunk_size']
+        checked = generated = 0
+        last_pk = 0
+        while True:
+            posts = list(
+                Post.objects.exclude(image='')
+                .filter(pk__gt=last_pk)
+                .order_by('pk')
+                .only('pk', 'image')[:size]
+            )
+            if not posts:
+                break
+            last_pk = posts[-1].pk
+            checked += len(posts)
+            incomplete = thumbnails.find_incomplete(
+                [post.image for post in posts]
+            )
+            for post in posts:
+                if post.image.name in incomplete:
+                    thumbnails.process(post.pk, post.image.name)
+                    generated += 1
+        self.stdout.write(
+            f'Проверено постов: {checked}, обработано: {generated}'
+        )
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import counters
+from posts.models import Post, User
+
+
+def chunks(queryset, size):
+    last_pk = 0
+    while True:
+        ids = list(
+            queryset.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:size]
+        )
+        if not ids:
+            return
+        yield ids
+        last_pk = ids[-1]
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики постов, подписок и комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Сколько строк пересчитывать в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        size = options['chunk_size']
+        users = posts = 0
+        for ids in chunks(User.objects.all(), size):
+            with transaction.atomic():
+                counters.rebuild_users(ids)
+            users += len(ids)
+        for ids in chunks(Post.objects.all(), size):
+            with transaction.atomic():
+                counters.rebuild_posts(ids)
+            posts += len(ids)
+        self.stdout.write(
+            f'Пересчитано пользователей: {users}, постов: {posts}'
+        )
@@ -0,0 +1,80 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from posts import search
+from posts.models import Post
+
+from .rebuild_counters import chunks
+
+INSERT = f'INSERT INTO {search.TABLE} (rowid, text) VALUES (%s, %s)'
+
+
+def read_chunk(ids):
+    try:
+        return [
+            (pk, search.normalize(text))
+            for pk, text in Post.objects.filter(
+                pk__gte=ids[0], pk__lte=ids[-1]
+            ).values_list('pk', 'text')
+        ]
+    finally:
+        # У каждого потока пула свое соединение с базой.
+        if threading.current_thread() is not threading.main_thread():
+            connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Сколько постов читать из базы за раз',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Сколько порций читать из базы параллельно',
+        )
+
+    def write(self, chunks_rows):
+        total = 0
+        with connection.cursor() as cursor:
+            for rows in chunks_rows:
+                cursor.executemany(INSERT, rows)
+                total += len(rows)
+        return total
+
+    def handle(self, *args, **options):
+        if not search.available():
+            raise CommandError('Полнотекстовый индекс есть только в SQLite')
+        # Очистка и заполнение — одна транзакция: поиск до коммита видит
+        # старый индекс, а посты, сохраненные во время перестройки, ждут
+        # блокировки записи и не попадают в индекс дважды (FTS5 с внешним
+        # содержимым не проверяет повторы rowid).
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {search.TABLE} ({search.TABLE}) "
+                    "VALUES ('delete-all')"
+                )
+            batches = chunks(Post.objects.all(), options['chunk_size'])
+            # Порции читаются параллельно, а пишет в индекс один поток:
+            # SQLite все равно допускает только одну пишущую транзакцию.
+            if options['workers'] > 1:
+                with ThreadPoolExecutor(options['workers']) as executor:
+                    total = self.write(executor.map(read_chunk, batches))
+            else:
+                total = self.write(map(read_chunk, batches))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {search.TABLE} ({search.TABLE}) "
+                "VALUES ('optimize')"
+            )
+        self.stdout.write(f'Проиндексировано постов: {total}')
@@ -0,0 +1,62 @@
+from django.db import migrations, transaction
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+CHUNK_SIZE = 500
+
+
+def count_subquery(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0
+    )
+
+
+def dedupe_follows(apps, schema_editor):
+    """
+    Оставляет по одной подписке на пару (user, author).
+
+    Дубликаты удаляются порциями в отдельных транзакциях, чтобы не
+    держать блокировку всей таблицы, после чего пересчитываются счетчики
+    подписчиков затронутых пользователей.
+    """
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    pairs = list(
+        Follow.objects.order_by()
+        .values('user_id', 'author_id')
+        .annotate(total=Count('pk'), keep=Min('pk'))
+        .filter(total__gt=1)
+        .values_list('user_id', 'author_id', 'keep')
+    )
+    for start in range(0, len(pairs), CHUNK_SIZE):
+        chunk = pairs[start:start + CHUNK_SIZE]
+        user_ids = set()
+        with transaction.atomic():
+            for user_id, author_id, keep in chunk:
+                Follow.objects.filter(
+                    user_id=user_id, author_id=author_id
+                ).exclude(pk=keep).delete()
+                user_ids.update((user_id, author_id))
+            UserStats.objects.filter(user_id__in=user_ids).update(
+                followers_count=count_subquery(Follow, 'author'),
+                following_count=count_subquery(Follow, 'user'),
+            )
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('posts', '0016_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_follows, migrations.RunPython.noop),
+    ]
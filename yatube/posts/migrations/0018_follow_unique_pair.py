@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_dedupe_follows'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='follow',
+            name='twice_follow_constraint',
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='posts_follow_unique_pair'),
+        ),
+        migrations.RemoveIndex(
+            model_name='follow',
+            name='posts_follow_user_author_idx',
+        ),
+    ]
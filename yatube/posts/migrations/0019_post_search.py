@@ -0,0 +1,55 @@
+from django.db import migrations
+
+TABLE = 'posts_post_fts'
+# «ё» и «е» в индексе не различаются, как и в запросах posts.search.
+NORMALIZED = "replace(replace({}.text, 'ё', 'е'), 'Ё', 'Е')"
+
+CREATE = (
+    f"CREATE VIRTUAL TABLE {TABLE} USING fts5("
+    f"text, content='posts_post', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER {TABLE}_insert AFTER INSERT ON posts_post BEGIN "
+    f"INSERT INTO {TABLE} (rowid, text) "
+    f"VALUES (new.id, {NORMALIZED.format('new')}); "
+    f"END",
+    f"CREATE TRIGGER {TABLE}_delete AFTER DELETE ON posts_post BEGIN "
+    f"INSERT INTO {TABLE} ({TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, {NORMALIZED.format('old')}); "
+    f"END",
+    f"CREATE TRIGGER {TABLE}_update AFTER UPDATE OF text ON posts_post "
+    f"BEGIN "
+    f"INSERT INTO {TABLE} ({TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, {NORMALIZED.format('old')}); "
+    f"INSERT INTO {TABLE} (rowid, text) "
+    f"VALUES (new.id, {NORMALIZED.format('new')}); "
+    f"END",
+    f"INSERT INTO {TABLE} (rowid, text) "
+    f"SELECT id, {NORMALIZED.format('posts_post')} FROM posts_post",
+)
+DROP = (
+    f'DROP TRIGGER IF EXISTS {TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {TABLE}_update',
+    f'DROP TABLE IF EXISTS {TABLE}',
+)
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        # Полнотекстовый индекс FTS5 есть только в SQLite.
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_follow_unique_pair'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(CREATE), run_on_sqlite(DROP)),
+    ]
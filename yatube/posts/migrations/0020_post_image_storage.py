@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:09
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_post_search'),
+    ]
+
+    # Хранилище не меняет схему, а AlterField в SQLite пересоздал бы
+    # posts_post и потерял бы триггеры полнотекстового индекса.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='post',
+                    name='image',
+                    field=models.ImageField(blank=True, help_text='Выберите картинку', storage=core.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+                ),
+            ],
+        ),
+    ]
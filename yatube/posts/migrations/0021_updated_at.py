@@ -0,0 +1,57 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:15
+
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models import F
+
+search = import_module('posts.migrations.0019_post_search')
+TRIGGERS = [
+    statement for statement in search.CREATE
+    if statement.startswith('CREATE TRIGGER')
+]
+
+
+def backfill_posts(apps, schema_editor):
+    # Пока поста не правили, он не менялся с публикации.
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(updated_at=F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_post_image_storage'),
+    ]
+
+    # AddField и RemoveField в SQLite пересоздают posts_post, а вместе со
+    # старой таблицей пропадают и триггеры полнотекстового индекса, поэтому
+    # они создаются заново после пересоздания в обе стороны.
+    operations = [
+        migrations.RunPython(
+            migrations.RunPython.noop, search.run_on_sqlite(TRIGGERS)
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='userstats',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['updated_at'], name='posts_post_updated_idx'),
+        ),
+        migrations.RunPython(backfill_posts, migrations.RunPython.noop),
+        migrations.RunPython(
+            search.run_on_sqlite(TRIGGERS), migrations.RunPython.noop
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from core.storage import ContentAddressedStorage
+
 
 User = get_user_model()
 
@@ -15,6 +17,7 @@ class Group(models.Model):
         unique=True
     )
     description = models.TextField(verbose_name="Описание")
+    updated_at = models.DateTimeField("Дата изменения", auto_now=True)
 
     def __str__(self):
         return self.title
@@ -37,7 +40,8 @@ class Post(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='posts',
-        verbose_name="Автор"
+        verbose_name="Автор",
+        db_index=False
     )
     group = models.ForeignKey(
         Group,
@@ -46,19 +50,50 @@ class Post(models.Model):
         on_delete=models.SET_NULL,
         related_name='posts',
         verbose_name="Сообщество",
-        help_text='Группа, к которой будет относиться пост'
+        help_text='Группа, к которой будет относиться пост',
+        db_index=False
     )
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True,
         help_text='Выберите картинку'
     )
+    comments_count = models.PositiveIntegerField(
+        'Комментариев',
+        default=0,
+        editable=False
+    )
+    # Меняется и при правке поста, и при изменении того, что видно в его
+    # карточке: числа комментариев, готовности миниатюры.
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta:
         ordering = ("-pub_date",)
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
+        # Ленты читаются по ключу (pub_date, id) в обратном порядке,
+        # профиль и группа — с фильтром по автору и группе.
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='posts_post_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='posts_post_author_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='posts_post_group_date_idx'
+            ),
+            # MAX(updated_at) для Last-Modified главной — по индексу.
+            models.Index(
+                fields=['updated_at'],
+                name='posts_post_updated_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'Пост автора {self.author}'
@@ -68,7 +103,8 @@ class Comment(models.Model):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
-        related_name='comments'
+        related_name='comments',
+        db_index=False
     )
     author = models.ForeignKey(
         User,
@@ -85,26 +121,44 @@ class Comment(models.Model):
         auto_now_add=True
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'pub_date', 'id'],
+                name='posts_comment_post_date_idx'
+            ),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        related_name='follower'
+        related_name='follower',
+        db_index=False
     )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='following',
+        db_index=False
     )
 
     class Meta:
         verbose_name = "Подписчик"
         verbose_name_plural = "Подписчики"
+        # Покрывающие индексы: подписки читателя (уникальный индекс пары)
+        # и подписчики автора читаются без обращения к самой таблице.
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='posts_follow_author_user_idx'
+            ),
+        ]
         constraints = [
-            models.CheckConstraint(
-                check=~models.Q(user=models.F('author')),
-                name='twice_follow_constraint'
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='posts_follow_unique_pair'
             ),
             models.CheckConstraint(
                 check=~models.Q(user=models.F('author')),
@@ -114,3 +168,112 @@ class Follow(models.Model):
 
     def __str__(self):
         return f'{self.user} follow {self.author}'
+
+
+class UserStats(models.Model):
+    """Счетчики пользователя, которые иначе считались бы через COUNT."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField("Постов", default=0)
+    followers_count = models.PositiveIntegerField("Подписчиков", default=0)
+    following_count = models.PositiveIntegerField("Подписок", default=0)
+    # Последняя активность: пост, подписка или отписка.
+    updated_at = models.DateTimeField("Дата изменения", auto_now=True)
+
+    class Meta:
+        verbose_name = "Статистика пользователя"
+        verbose_name_plural = "Статистика пользователей"
+
+    def __str__(self):
+        return f'Статистика {self.user_id}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в домашней ленте подписчика (fan-out при публикации)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        db_index=False
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField("Дата публикации")
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='posts_timeline_user_date_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='posts_timeline_unique_post'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} в ленте {self.user_id}'
+
+
+class Change(models.Model):
+    """
+    Запись журнала изменений для синхронизации клиентов (posts.changelog).
+
+    Журнал только пополняется; id записи служит монотонным токеном.
+    owner_id — пользователь, чьей ленты касается изменение: автор поста,
+    автор поста под комментарием или подписчик.
+    """
+    POST = 'post'
+    COMMENT = 'comment'
+    FOLLOW = 'follow'
+    KINDS = (
+        (POST, 'Пост'),
+        (COMMENT, 'Комментарий'),
+        (FOLLOW, 'Подписка'),
+    )
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    ACTIONS = (
+        (CREATED, 'Создание'),
+        (UPDATED, 'Изменение'),
+        (DELETED, 'Удаление'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField("Что изменилось", max_length=16, choices=KINDS)
+    action = models.CharField("Действие", max_length=16, choices=ACTIONS)
+    object_id = models.PositiveIntegerField("id объекта")
+    # Без внешних ключей: записи переживают удаление пользователей.
+    owner_id = models.PositiveIntegerField("Чьих лент касается")
+    created = models.DateTimeField("Дата", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Изменение"
+        verbose_name_plural = "Журнал изменений"
+        indexes = [
+            models.Index(
+                fields=['owner_id', 'id'],
+                name='posts_change_owner_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id} {self.action}'
@@ -0,0 +1,236 @@
+import binascii
+import hashlib
+
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes, force_str
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+MAX_PK = 2 ** 63 - 1
+
+
+def encode_cursor(pub_date, pk):
+    raw = f'{pub_date.isoformat()}|{pk}'
+    return urlsafe_base64_encode(force_bytes(raw))
+
+
+def decode_cursor(token):
+    """Возвращает пару (pub_date, pk) или None, если токен испорчен."""
+    try:
+        stamp, pk = force_str(urlsafe_base64_decode(token)).rsplit('|', 1)
+        pub_date = parse_datetime(stamp)
+        pk = int(pk)
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+        return None
+    # pk вне BIGINT база отвергла бы с OverflowError.
+    if pub_date is None or not 0 <= pk <= MAX_PK:
+        return None
+    return pub_date, pk
+
+
+class CursorPaginator(Paginator):
+    """
+    Постраничный вывод по ключу (pub_date, id) вместо LIMIT/OFFSET.
+
+    Страница выбирается одним запросом по индексу, без COUNT(*), поэтому
+    пятитысячная страница стоит столько же, сколько первая, а новые посты
+    не сдвигают уже открытые страницы. Номера страниц условные: 1 для
+    первой страницы и 2 для любой следующей, их хватает методам Page.
+    """
+    template_name = 'posts/includes/cursor_links.html'
+    num_pages = 1
+
+    def __init__(self, object_list, per_page, date_field='pub_date',
+                 pk_field='id', descending=True):
+        self.date_field = date_field
+        self.pk_field = pk_field
+        self.descending = descending
+        super().__init__(object_list, per_page)
+
+    def _check_object_list_is_ordered(self):
+        # Порядок задается самим пагинатором в fetch().
+        pass
+
+    def get_key(self, row):
+        return getattr(row, self.date_field), getattr(row, self.pk_field)
+
+    def make_cursor(self, row):
+        return encode_cursor(*self.get_key(row))
+
+    def read_cursor(self, token):
+        return decode_cursor(token)
+
+    def ordering(self, descending):
+        sign = '-' if descending else ''
+        return sign + self.date_field, sign + self.pk_field
+
+    def keyset_filter(self, anchor, descending):
+        pub_date, pk = anchor
+        lookup = 'lt' if descending else 'gt'
+        # Отдельное условие на дату оставляет индексу диапазон по pub_date.
+        return Q(**{f'{self.date_field}__{lookup}e': pub_date}) & (
+            Q(**{f'{self.date_field}__{lookup}': pub_date})
+            | Q(**{f'{self.pk_field}__{lookup}': pk})
+        )
+
+    def fetch(self, anchor, backwards, limit):
+        descending = self.descending != backwards
+        queryset = self.object_list
+        if anchor is not None:
+            queryset = queryset.filter(self.keyset_filter(anchor, descending))
+        return list(queryset.order_by(*self.ordering(descending))[:limit])
+
+    def get_page(self, after=None, before=None):
+        anchor = self.read_cursor(before) if before else None
+        backwards = anchor is not None
+        if anchor is None and after:
+            anchor = self.read_cursor(after)
+        rows = self.fetch(anchor, backwards, self.per_page + 1)
+        if backwards and not rows:
+            # Перед якорем ничего не осталось: показываем начало ленты.
+            return self.get_page()
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, anchor is not None
+        number = 2 if has_previous else 1
+        self.num_pages = number + 1 if has_next else number
+        page = Page(rows, number, self)
+        page.next_cursor = (
+            self.make_cursor(rows[-1])
+            if has_next and rows else None
+        )
+        page.previous_cursor = (
+            self.make_cursor(rows[0])
+            if has_previous and rows else None
+        )
+        return page
+
+
+class ValuesCursorPaginator(CursorPaginator):
+    """CursorPaginator для строк .values(): ключ берется из словаря."""
+
+    def get_key(self, row):
+        return row[self.date_field], row[self.pk_field]
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Нумерованные страницы с кэшированным COUNT(*) и окном ссылок.
+
+    Количество строк считается не чаще раза в count_timeout секунд на
+    один и тот же запрос, а шаблону отдается только окно номеров вокруг
+    текущей страницы: page_obj.window, где None означает пропуск.
+    """
+    template_name = 'posts/includes/page_links.html'
+
+    def __init__(self, object_list, per_page, count_timeout=60,
+                 on_each_side=2, on_ends=1, **kwargs):
+        self.count_timeout = count_timeout
+        self.on_each_side = on_each_side
+        self.on_ends = on_ends
+        super().__init__(object_list, per_page, **kwargs)
+
+    def count_key(self):
+        sql, params = self.object_list.query.sql_with_params()
+        digest = hashlib.md5(force_bytes(f'{sql}|{params}')).hexdigest()
+        return f'paginator:count:{digest}'
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return len(self.object_list)
+        key = self.count_key()
+        total = cache.get(key)
+        if total is None:
+            total = self.object_list.count()
+            cache.set(key, total, self.count_timeout)
+        return total
+
+    def page_window(self, number):
+        last = self.num_pages
+        pages = set(range(1, min(self.on_ends, last) + 1))
+        pages.update(range(max(last - self.on_ends + 1, 1), last + 1))
+        pages.update(range(
+            max(number - self.on_each_side, 1),
+            min(number + self.on_each_side, last) + 1
+        ))
+        window = []
+        previous = 0
+        for page in sorted(pages):
+            if page - previous > 1:
+                window.append(None)
+            window.append(page)
+            previous = page
+        return window
+
+    def _get_page(self, *args, **kwargs):
+        page = super()._get_page(*args, **kwargs)
+        page.window = self.page_window(page.number)
+        return page
+
+
+def estimate_rows(model, using):
+    """Число строк таблицы по статистике планировщика или None."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master "
+                "WHERE type = 'table' AND name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table]
+            )
+            row = cursor.fetchone()
+            return int(row[0].split()[0]) if row else None
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [table]
+            )
+            row = cursor.fetchone()
+            return int(row[0]) if row and row[0] >= 0 else None
+    return None
+
+
+class EstimatedCountPaginator(CachedCountPaginator):
+    """
+    Пагинатор админки для больших таблиц.
+
+    Число строк в таблице без фильтров берется из статистики ANALYZE,
+    если таблица больше estimate_threshold строк. Отфильтрованный список
+    считается честно, но не чаще раза в count_timeout секунд.
+    """
+    estimate_threshold = 10000
+
+    def __init__(self, object_list, per_page, orphans=0,
+                 allow_empty_first_page=True, **kwargs):
+        super().__init__(
+            object_list,
+            per_page,
+            orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page,
+            **kwargs
+        )
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimate_rows(
+                self.object_list.model, self.object_list.db
+            )
+            if estimate is not None and estimate >= self.estimate_threshold:
+                return estimate
+        return super().count
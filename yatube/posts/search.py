@@ -0,0 +1,159 @@
+"""
+Полнотекстовый поиск по постам на SQLite FTS5.
+
+Таблица posts_post_fts индексирует Post.text без копии самого текста
+(content='posts_post'), триггеры из миграции 0019 держат ее в актуальном
+состоянии. Токенизатор unicode61 приводит кириллицу к нижнему регистру,
+а «ё» заменяется на «е» и в индексе, и в запросе. Окончания слов запроса
+отбрасываются, а оставшаяся основа ищется как префикс, так что «ежики»
+находит и «ежик», и «ежиками».
+
+SQLite удаляет триггеры вместе с таблицей, поэтому миграция, которая
+пересоздает posts_post (например, AddField), должна создать их заново.
+На других СУБД индекса нет, и поиск сводится к icontains.
+"""
+import binascii
+import html
+import re
+
+from django.db import connection
+from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from django.utils.safestring import mark_safe
+
+from .models import Post
+from .paginators import CursorPaginator
+
+TABLE = 'posts_post_fts'
+# Текст фрагмента экранируется целиком, и только потом маркеры совпадений
+# заменяются на <mark>.
+MARK_START = '\x02'
+MARK_END = '\x03'
+SNIPPET_TOKENS = 16
+MIN_STEM = 3
+ENDINGS = (
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'ов', 'ев', 'ей', 'ой', 'ый', 'ий', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие',
+    'ам', 'ям', 'ах', 'ях', 'ом', 'ем', 'ую', 'юю',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+)
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def normalize(text):
+    return text.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def stem(word):
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def match_expression(query):
+    """Запрос пользователя в виде выражения MATCH: все основы как префиксы."""
+    words = re.findall(r'\w+', normalize(query).lower())
+    return ' '.join(f'"{stem(word)}"*' for word in words)
+
+
+def filter_posts(queryset, query):
+    expression = match_expression(query)
+    if not expression:
+        return queryset.none()
+    if not available():
+        return queryset.filter(text__icontains=query)
+    # RawSQL внутри __in дает лишние скобки, и SQLite сравнивает id
+    # только с первой строкой подзапроса, поэтому условие через extra().
+    table = queryset.model._meta.db_table
+    return queryset.extra(
+        where=[
+            f'{table}.id IN '
+            f'(SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s)'
+        ],
+        params=[expression]
+    )
+
+
+def highlight(snippet):
+    return mark_safe(
+        html.escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+class SearchPaginator(CursorPaginator):
+    """
+    Результаты поиска по убыванию релевантности (bm25), по ключу (rank, id).
+
+    Каждому посту на странице добавляются search_rank и snippet —
+    фрагмент текста с подсвеченными совпадениями.
+    """
+
+    def __init__(self, query, per_page):
+        super().__init__(
+            Post.objects.select_related('author', 'group'),
+            per_page,
+            descending=False
+        )
+        self.expression = match_expression(query)
+
+    def get_key(self, row):
+        return row.search_rank, row.pk
+
+    def make_cursor(self, row):
+        rank, pk = self.get_key(row)
+        return urlsafe_base64_encode(force_bytes(f'{rank!r}|{pk}'))
+
+    def read_cursor(self, token):
+        try:
+            rank, pk = force_str(urlsafe_base64_decode(token)).split('|')
+            return float(rank), int(pk)
+        except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+            return None
+
+    def fetch(self, anchor, backwards, limit):
+        if not self.expression:
+            return []
+        # bm25 тем меньше, чем релевантнее пост.
+        sign, order = ('<', 'DESC') if backwards else ('>', 'ASC')
+        sql = (
+            f'SELECT rowid, score, snippet FROM ('
+            f'SELECT rowid, bm25({TABLE}) AS score, '
+            f'snippet({TABLE}, 0, %s, %s, %s, %s) AS snippet '
+            f'FROM {TABLE} WHERE {TABLE} MATCH %s)'
+        )
+        params = [MARK_START, MARK_END, '…', SNIPPET_TOKENS, self.expression]
+        if anchor is not None:
+            sql += (
+                f' WHERE score {sign} %s'
+                f' OR (score = %s AND rowid {sign} %s)'
+            )
+            params += [anchor[0], anchor[0], anchor[1]]
+        sql += f' ORDER BY score {order}, rowid {order} LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            hits = cursor.fetchall()
+        posts = self.object_list.in_bulk([pk for pk, _, _ in hits])
+        rows = []
+        for pk, rank, snippet in hits:
+            post = posts.get(pk)
+            if post is not None:
+                post.search_rank = rank
+                post.snippet = highlight(snippet)
+                rows.append(post)
+        return rows
+
+
+def get_paginator(query, per_page):
+    if available():
+        return SearchPaginator(query, per_page)
+    return CursorPaginator(
+        filter_posts(Post.objects.select_related('author', 'group'), query),
+        per_page
+    )
@@ -0,0 +1,274 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from core import cache_tags
+
+from . import (
+    changelog, conditional, counters, fanin, thumbnails, timeline
+)
+from .caching import FEED_INDEX, author_tag, group_tag, post_tag
+from .models import (
+    Change, Comment, Follow, Group, Post, User, UserStats
+)
+
+
+@receiver(post_save, sender=Post)
+def on_post_created(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user(instance.author_id, 'posts_count', 1)
+        timeline.push_post(instance)
+        fanin.discard(instance.author_id)
+
+
+@receiver(post_delete, sender=Post)
+def on_post_deleted(sender, instance, **kwargs):
+    # Обновляет и updated_at статистики — Last-Modified профиля.
+    counters.change_user(instance.author_id, 'posts_count', -1)
+    conditional.touch_index()
+    fanin.discard(instance.author_id)
+
+
+@receiver(post_save, sender=User)
+def on_user_created(sender, instance, created, **kwargs):
+    # id удаленного пользователя может достаться новому.
+    if created:
+        fanin.discard(instance.pk)
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_init, sender=Comment)
+def remember_comment_post(sender, instance, **kwargs):
+    # Комментарий можно перенести к другому посту в админке.
+    instance._loaded_post_id = instance.__dict__.get('post_id')
+
+
+@receiver(post_init, sender=Follow)
+def remember_follow_pair(sender, instance, **kwargs):
+    # Подписку можно переназначить в админке.
+    instance._loaded_user_id = instance.__dict__.get('user_id')
+    instance._loaded_author_id = instance.__dict__.get('author_id')
+
+
+def moved_post_id(comment):
+    """Прежний пост перенесенного комментария или None."""
+    loaded = comment._loaded_post_id
+    if loaded is not None and loaded != comment.post_id:
+        return loaded
+    return None
+
+
+def moved_pair(follow):
+    """Прежняя пара (user_id, author_id) переназначенной подписки или None."""
+    loaded = follow._loaded_user_id, follow._loaded_author_id
+    if None not in loaded and loaded != (follow.user_id, follow.author_id):
+        return loaded
+    return None
+
+
+@receiver(post_save, sender=Comment)
+def on_comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comments(instance.post_id, 1)
+        return
+    old_post_id = moved_post_id(instance)
+    if old_post_id is not None:
+        counters.change_comments(old_post_id, -1)
+        counters.change_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def on_comment_deleted(sender, instance, **kwargs):
+    counters.change_comments(instance.post_id, -1)
+
+
+def follow_added(user_id, author_id):
+    counters.change_user(author_id, 'followers_count', 1)
+    counters.change_user(user_id, 'following_count', 1)
+    timeline.backfill(user_id, author_id)
+
+
+def follow_removed(user_id, author_id):
+    counters.change_user(author_id, 'followers_count', -1)
+    counters.change_user(user_id, 'following_count', -1)
+    timeline.remove(user_id, author_id)
+
+
+@receiver(post_save, sender=Follow)
+def on_follow_saved(sender, instance, created, **kwargs):
+    old = None if created else moved_pair(instance)
+    if old is not None:
+        follow_removed(*old)
+    if created or old is not None:
+        follow_added(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def on_follow_deleted(sender, instance, **kwargs):
+    follow_removed(instance.user_id, instance.author_id)
+
+
+def loaded_image(post):
+    # Без обращения к дескриптору: отложенное поле стоило бы запроса.
+    value = post.__dict__.get('image')
+    return getattr(value, 'name', value)
+
+
+@receiver(post_init, sender=Post)
+def remember_loaded(sender, instance, **kwargs):
+    # При смене группы сбрасывать нужно и старую ленту группы.
+    instance._loaded_group_id = instance.group_id
+    instance._loaded_image = loaded_image(instance)
+
+
+@receiver(post_save, sender=Post)
+def schedule_thumbnails(sender, instance, created, **kwargs):
+    # Любой путь сохранения — форма, админка или ORM — режет миниатюры.
+    if instance.image and (
+        created or instance.image.name != instance._loaded_image
+    ):
+        thumbnails.schedule(instance)
+    instance._loaded_image = loaded_image(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    group_ids = {instance.group_id, instance._loaded_group_id} - {None}
+    # Лента группы меняется и когда пост из нее уходит.
+    conditional.touch([instance.author_id], group_ids)
+    slugs = Group.objects.filter(pk__in=group_ids).values_list(
+        'slug', flat=True
+    ) if group_ids else []
+    cache_tags.invalidate_on_commit(
+        FEED_INDEX,
+        post_tag(instance.pk),
+        author_tag(instance.author_id),
+        *(group_tag(slug) for slug in slugs)
+    )
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_init, sender=Group)
+def remember_slug(sender, instance, **kwargs):
+    # Страницы, закэшированные под прежним адресом группы, тоже устарели.
+    instance._loaded_slug = instance.__dict__.get('slug')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    slugs = {instance.slug, instance._loaded_slug} - {None}
+    cache_tags.invalidate_on_commit(*(group_tag(slug) for slug in slugs))
+    instance._loaded_slug = instance.slug
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment(sender, instance, **kwargs):
+    post_ids = {instance.post_id, instance._loaded_post_id} - {None}
+    cache_tags.invalidate_on_commit(
+        *(post_tag(post_id) for post_id in post_ids)
+    )
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow(sender, instance, **kwargs):
+    user_ids = {
+        instance.author_id, instance.user_id,
+        instance._loaded_author_id, instance._loaded_user_id,
+    } - {None}
+    cache_tags.invalidate_on_commit(
+        *(author_tag(user_id) for user_id in user_ids)
+    )
+
+
+def post_owner(post_id):
+    return Post.objects.filter(pk=post_id).values_list(
+        'author_id', flat=True
+    ).first()
+
+
+def comment_owner(comment):
+    """Автор поста под комментарием: лента, которой касается комментарий."""
+    if Comment.post.is_cached(comment):
+        return comment.post.author_id
+    return post_owner(comment.post_id)
+
+
+@receiver(post_save, sender=Post)
+def log_post_saved(sender, instance, created, **kwargs):
+    changelog.record(
+        Change.POST,
+        Change.CREATED if created else Change.UPDATED,
+        instance.pk,
+        instance.author_id
+    )
+
+
+@receiver(post_delete, sender=Post)
+def log_post_deleted(sender, instance, **kwargs):
+    changelog.record(
+        Change.POST, Change.DELETED, instance.pk, instance.author_id
+    )
+
+
+@receiver(post_save, sender=Comment)
+def log_comment_saved(sender, instance, created, **kwargs):
+    old_post_id = None if created else moved_post_id(instance)
+    old_owner_id = old_post_id and post_owner(old_post_id)
+    if old_owner_id is not None:
+        # В ленте прежнего автора комментарий пропал.
+        changelog.record(
+            Change.COMMENT, Change.DELETED, instance.pk, old_owner_id
+        )
+    owner_id = comment_owner(instance)
+    if owner_id is not None:
+        changelog.record(
+            Change.COMMENT,
+            Change.CREATED if created else Change.UPDATED,
+            instance.pk,
+            owner_id
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def log_comment_deleted(sender, instance, **kwargs):
+    # При удалении поста его комментарии уходят вместе с ним.
+    owner_id = comment_owner(instance)
+    if owner_id is not None:
+        changelog.record(
+            Change.COMMENT, Change.DELETED, instance.pk, owner_id
+        )
+
+
+@receiver(post_save, sender=Follow)
+def log_follow_saved(sender, instance, created, **kwargs):
+    # Подписка определяется автором, поэтому в журнал пишется его id.
+    old = None if created else moved_pair(instance)
+    if old is not None:
+        user_id, author_id = old
+        changelog.record(Change.FOLLOW, Change.DELETED, author_id, user_id)
+    if created or old is not None:
+        changelog.record(
+            Change.FOLLOW, Change.CREATED, instance.author_id,
+            instance.user_id
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def log_follow_deleted(sender, instance, **kwargs):
+    changelog.record(
+        Change.FOLLOW, Change.DELETED, instance.author_id, instance.user_id
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Follow)
+def remember_saved(sender, instance, **kwargs):
+    # Последний из обработчиков: следующее сохранение сравнивается уже
+    # с записанным.
+    if sender is Comment:
+        remember_comment_post(sender, instance)
+    else:
+        remember_follow_pair(sender, instance)
@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.paginators import EstimatedCountPaginator
+
+User = get_user_model()
+
+
+class AdminChangelistTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.group = Group.objects.create(
+            title='Группа', slug='cats', description='Описание'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def add_rows(self, count):
+        start = User.objects.count()
+        User.objects.bulk_create(
+            User(username=f'user{start + i}') for i in range(count)
+        )
+        users = list(User.objects.order_by('-pk')[:count])
+        Post.objects.bulk_create(
+            Post(text='Пост', author=user, group=self.group)
+            for user in users
+        )
+        posts = list(Post.objects.order_by('-pk')[:count])
+        Comment.objects.bulk_create(
+            Comment(post=post, author=post.author, text='Комментарий')
+            for post in posts
+        )
+        Follow.objects.bulk_create(
+            Follow(user=self.admin, author=user) for user in users
+        )
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Число запросов списка не зависит от числа строк на странице."""
+        urls = [
+            reverse('admin:posts_post_changelist'),
+            reverse('admin:posts_comment_changelist'),
+            reverse('admin:posts_follow_changelist'),
+        ]
+        self.add_rows(2)
+        before = {url: self.count_queries(url) for url in urls}
+        self.add_rows(8)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), before[url])
+
+    def test_remove_from_group_action(self):
+        self.add_rows(3)
+        group_url = reverse('posts:group_list', args=[self.group.slug])
+        self.assertContains(Client().get(group_url), 'Пост')
+        response = self.client.post(
+            reverse('admin:posts_post_changelist'),
+            {
+                'action': 'remove_from_group',
+                '_selected_action': list(
+                    Post.objects.values_list('pk', flat=True)
+                ),
+            }
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Post.objects.exclude(group=None).exists())
+        self.assertNotContains(Client().get(group_url), 'Пост')
+
+    def test_unfiltered_count_is_estimated(self):
+        """Без фильтров число строк берется из статистики ANALYZE."""
+        self.add_rows(5)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.add_rows(5)
+        paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+        paginator.estimate_threshold = 0
+        if connection.vendor == 'sqlite':
+            self.assertEqual(paginator.count, 5)
+        filtered = EstimatedCountPaginator(
+            Post.objects.filter(group=self.group), 10
+        )
+        filtered.estimate_threshold = 0
+        self.assertEqual(filtered.count, 10)
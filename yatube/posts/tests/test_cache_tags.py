@@ -0,0 +1,114 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import cache_tags
+from posts.caching import post_tag
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class CacheTagsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_invalidate_drops_only_tagged_values(self):
+        cache_tags.set('first', 'значение 1', ['post:1', 'feed:index'])
+        cache_tags.set('second', 'значение 2', ['post:2'])
+        cache_tags.invalidate('post:1')
+        self.assertIsNone(cache_tags.get('first', ['post:1', 'feed:index']))
+        self.assertEqual(cache_tags.get('second', ['post:2']), 'значение 2')
+
+    def test_get_or_set_calls_func_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return 'результат'
+
+        for _ in range(2):
+            value = cache_tags.get_or_set('value', ['group:cats'], compute)
+        self.assertEqual(value, 'результат')
+        self.assertEqual(len(calls), 1)
+
+    def test_evicted_tag_does_not_revive_old_values(self):
+        cache_tags.set('value', 'старое', ['author:1'])
+        cache.delete(cache_tags.TAG_KEY.format('author:1'))
+        cache_tags.invalidate('author:1')
+        self.assertIsNone(cache_tags.get('value', ['author:1']))
+
+
+class FragmentInvalidationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Автор')
+        cls.group = Group.objects.create(
+            title='Группа', slug='cats', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Исходный текст', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_post_edit_refreshes_cached_feeds(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+        ]
+        for url in urls:
+            self.client.get(url)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Новый текст')
+
+    def test_new_comment_refreshes_card_counter(self):
+        url = reverse('posts:index')
+        self.assertContains(self.client.get(url), 'Комментариев: 0')
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Комментарий'
+        )
+        self.assertContains(self.client.get(url), 'Комментариев: 1')
+
+    def test_moving_post_refreshes_old_group(self):
+        url = reverse('posts:group_list', args=[self.group.slug])
+        self.assertContains(self.client.get(url), 'Исходный текст')
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = None
+        post.save()
+        self.assertNotContains(self.client.get(url), 'Исходный текст')
+
+    def test_tags_are_invalidated_again_after_commit(self):
+        """
+        Страница, собранная до коммита из старых строк, не переживает
+        коммит: версии тегов сдвигаются еще раз.
+        """
+        tag = post_tag(self.post.pk)
+        with mock.patch.object(
+            cache_tags.transaction, 'on_commit'
+        ) as on_commit:
+            Comment.objects.create(
+                post=self.post, author=self.author, text='Комментарий'
+            )
+        before = cache_tags.tag_versions([tag])
+        for (callback, *_), _ in on_commit.call_args_list:
+            callback()
+        self.assertNotEqual(cache_tags.tag_versions([tag]), before)
+
+    def test_slug_change_refreshes_old_address(self):
+        url = reverse('posts:group_list', args=[self.group.slug])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed'
+        group.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,86 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils.http import urlsafe_base64_encode
+
+from posts import changelog
+from posts.models import Change, Comment, Follow, Post
+
+User = get_user_model()
+
+
+class ChangeLogTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Автор')
+        cls.reader = User.objects.create_user(username='Читатель')
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def log(self):
+        return list(
+            Change.objects.order_by('id')
+            .values_list('kind', 'action', 'object_id', 'owner_id')
+        )
+
+    def test_posts_comments_and_follows_are_logged(self):
+        """Создание, правка и удаление пишутся в журнал по порядку."""
+        self.author_client.post(
+            reverse('posts:post_create'), {'text': 'Пост'}
+        )
+        post = Post.objects.get()
+        self.author_client.post(
+            reverse('posts:post_edit', args=[post.pk]), {'text': 'Правка'}
+        )
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        follow.delete()
+        Post.objects.get().delete()
+        a, r = self.author.pk, self.reader.pk
+        self.assertEqual(self.log(), [
+            (Change.POST, Change.CREATED, post.pk, a),
+            (Change.POST, Change.UPDATED, post.pk, a),
+            (Change.COMMENT, Change.CREATED, comment.pk, a),
+            (Change.FOLLOW, Change.CREATED, a, r),
+            (Change.FOLLOW, Change.DELETED, a, r),
+            (Change.COMMENT, Change.DELETED, comment.pk, a),
+            (Change.POST, Change.DELETED, post.pk, a),
+        ])
+
+    def test_changes_for_follower(self):
+        """Подписчик видит изменения авторов, повторы схлопываются."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        since = Change.objects.order_by('id').last().pk
+        post = Post.objects.create(text='Пост', author=self.author)
+        post.text = 'Правка'
+        post.save()
+        Post.objects.create(text='Чужой', author=self.reader)
+        changes, last, more = changelog.changes_for(self.reader, since, 10)
+        self.assertFalse(more)
+        self.assertEqual(last, Change.objects.order_by('id').last().pk)
+        self.assertIn(
+            {'type': Change.POST, 'action': Change.CREATED, 'id': post.pk},
+            changes
+        )
+        self.assertEqual(len(changes), 2)
+        changes, last, more = changelog.changes_for(self.reader, since, 1)
+        self.assertTrue(more)
+        self.assertEqual(len(changes), 1)
+
+
+class TokenTest(SimpleTestCase):
+    def test_round_trip_and_garbage(self):
+        token = changelog.encode_token(42)
+        self.assertEqual(changelog.decode_token(token), 42)
+        for token in (
+            '', 'мусор', 'Yzk5eA', '!!!',
+            urlsafe_base64_encode('c²'.encode()),
+            urlsafe_base64_encode(('c' + '9' * 30).encode()),
+        ):
+            with self.subTest(token=token):
+                self.assertIsNone(changelog.decode_token(token))
@@ -0,0 +1,191 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import conditional
+from posts.models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Автор')
+        cls.reader = User.objects.create_user(username='Читатель')
+        cls.group = Group.objects.create(
+            title='Группа', slug='cats', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Текст поста', author=cls.author, group=cls.group
+        )
+        cls.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[cls.group.slug]),
+            reverse('posts:profile', args=[cls.author.username]),
+            reverse('posts:post_detail', args=[cls.post.pk]),
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def revalidate(self, client, url, response):
+        return client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_pages_answer_not_modified(self):
+        """Повтор с If-None-Match получает 304, а кэшированная — без базы."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.has_header('Last-Modified'))
+                with self.assertNumQueries(0):
+                    again = self.revalidate(self.client, url, response)
+                self.assertEqual(again.status_code, 304)
+
+    def test_not_modified_skips_view_queries(self):
+        """Без кэша страниц 304 стоит одного запроса сверх сессии."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.reader_client.get(url)
+                # Сессия, пользователь и состояние страницы.
+                with self.assertNumQueries(3):
+                    again = self.revalidate(self.reader_client, url, response)
+                self.assertEqual(again.status_code, 304)
+
+    def test_if_modified_since(self):
+        url = self.urls[3]
+        response = self.client.get(url)
+        cache.clear()
+        again = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(again.status_code, 304)
+
+    def test_deletion_defeats_if_modified_since(self):
+        """Удаление поста меняет Last-Modified главной, группы и профиля."""
+        gone = Post.objects.create(
+            text='Удаляемый', author=self.author, group=self.group
+        )
+        # Last-Modified считается в секундах: все остальное — в прошлом.
+        past = timezone.now() - timedelta(hours=1)
+        Post.objects.update(updated_at=past)
+        Group.objects.update(updated_at=past)
+        UserStats.objects.update(updated_at=past)
+        cache.set(conditional.INDEX_CHANGED_KEY, past, None)
+        index, group, profile, _ = self.urls
+        responses = {
+            url: self.reader_client.get(url)
+            for url in (index, group, profile)
+        }
+        gone.delete()
+        for url, response in responses.items():
+            with self.subTest(url=url):
+                again = self.reader_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                )
+                self.assertEqual(again.status_code, 200)
+
+    def test_changes_produce_new_validators(self):
+        index, group, profile, detail = self.urls
+        changes = [
+            (
+                lambda: Post.objects.get(pk=self.post.pk).save(),
+                self.urls
+            ),
+            (
+                lambda: Comment.objects.create(
+                    post=self.post, author=self.reader, text='Комментарий'
+                ),
+                self.urls
+            ),
+            (
+                lambda: Follow.objects.create(
+                    user=self.reader, author=self.author
+                ),
+                [profile, detail]
+            ),
+            (
+                lambda: Post.objects.create(text='Еще', author=self.author),
+                [index, profile, detail]
+            ),
+            (
+                lambda: Post.objects.filter(text='Еще').get().delete(),
+                [index, profile, detail]
+            ),
+        ]
+        for change, changed in changes:
+            responses = {url: self.client.get(url) for url in self.urls}
+            change()
+            for url, response in responses.items():
+                with self.subTest(url=url):
+                    again = self.revalidate(self.client, url, response)
+                    self.assertEqual(
+                        again.status_code, 200 if url in changed else 304
+                    )
+
+    def test_follow_state_reads_only_stats(self):
+        """Правки постов авторов видны ленте подписок без чтения постов."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        request = RequestFactory().get('/')
+        request.user = self.reader
+        changes = [
+            lambda: Post.objects.get(pk=self.post.pk).save(),
+            lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'
+            ),
+        ]
+        for change in changes:
+            past = timezone.now() - timedelta(hours=1)
+            UserStats.objects.update(updated_at=past)
+            with CaptureQueriesContext(connection) as queries:
+                before, _ = conditional.follow_state(request)
+            self.assertEqual(len(queries), 1)
+            self.assertNotIn('posts_post', queries[0]['sql'])
+            change()
+            after, _ = conditional.follow_state(request)
+            self.assertGreater(after, before)
+
+    def test_feed_states_do_not_read_posts(self):
+        """Группа и профиль берут Last-Modified из одной своей строки."""
+        request = RequestFactory().get('/')
+        for state, arg in (
+            (conditional.group_state, self.group.slug),
+            (conditional.profile_state, self.author.username),
+        ):
+            with self.subTest(state=state.__name__):
+                with CaptureQueriesContext(connection) as queries:
+                    self.assertIsNotNone(state(request, arg))
+                self.assertEqual(len(queries), 1)
+                self.assertNotIn('posts_post', queries[0]['sql'])
+
+    def test_follow_index_answers_not_modified(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        url = reverse('posts:follow_index')
+        response = self.reader_client.get(url)
+        self.assertEqual(
+            self.revalidate(self.reader_client, url, response).status_code,
+            304
+        )
+        Post.objects.get(pk=self.post.pk).save()
+        self.assertEqual(
+            self.revalidate(self.reader_client, url, response).status_code,
+            200
+        )
+
+    def test_validators_differ_per_user(self):
+        url = self.urls[0]
+        response = self.client.get(url)
+        again = self.revalidate(self.reader_client, url, response)
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(
+            self.revalidate(self.reader_client, url, again).status_code, 304
+        )
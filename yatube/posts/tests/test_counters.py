@@ -0,0 +1,127 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import timeline
+from posts.models import (
+    Change, Comment, Follow, Post, TimelineEntry, UserStats
+)
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Автор')
+        cls.reader = User.objects.create_user(username='Читатель')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def get_stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_and_comment_counters(self):
+        self.reader_client.post(
+            reverse('posts:post_create'), {'text': 'Пост читателя'}
+        )
+        post = Post.objects.get(author=self.reader)
+        self.assertEqual(self.get_stats(self.reader).posts_count, 1)
+        self.reader_client.post(
+            reverse('posts:add_comment', args=[post.pk]),
+            {'text': 'Комментарий'}
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        Comment.objects.get(post=post).delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        post.delete()
+        self.assertEqual(self.get_stats(self.reader).posts_count, 0)
+
+    def test_post_create_is_atomic(self):
+        """Пост и счетчики пишутся вместе: сбой откатывает и пост."""
+        with mock.patch.object(
+            timeline, 'push_post', side_effect=RuntimeError
+        ), self.assertRaises(RuntimeError):
+            self.reader_client.post(
+                reverse('posts:post_create'), {'text': 'Пост читателя'}
+            )
+        self.assertFalse(Post.objects.filter(author=self.reader).exists())
+        self.assertEqual(self.get_stats(self.reader).posts_count, 0)
+
+    def test_follow_counters(self):
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        self.assertEqual(self.get_stats(self.author).followers_count, 1)
+        self.assertEqual(self.get_stats(self.reader).following_count, 1)
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertEqual(self.get_stats(self.author).followers_count, 0)
+        self.assertEqual(self.get_stats(self.reader).following_count, 0)
+
+    def test_moved_comment_and_follow_move_counters(self):
+        """Перенос комментария или подписки в админке переносит и счетчики."""
+        first = Post.objects.create(text='Первый', author=self.author)
+        second = Post.objects.create(text='Второй', author=self.reader)
+        comment = Comment.objects.create(
+            post=first, author=self.reader, text='Комментарий'
+        )
+        comment = Comment.objects.get(pk=comment.pk)
+        comment.post = second
+        comment.save()
+        comment.save()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.comments_count, 0)
+        self.assertEqual(second.comments_count, 1)
+        self.assertTrue(Change.objects.filter(
+            kind=Change.COMMENT, action=Change.DELETED,
+            object_id=comment.pk, owner_id=self.author.pk
+        ).exists())
+
+        other = User.objects.create_user(username='Другой')
+        Post.objects.create(text='Пост другого', author=other)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        follow = Follow.objects.get(pk=follow.pk)
+        follow.author = other
+        follow.save()
+        self.assertEqual(self.get_stats(self.author).followers_count, 0)
+        self.assertEqual(self.get_stats(other).followers_count, 1)
+        self.assertEqual(self.get_stats(self.reader).following_count, 1)
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(user=self.reader)
+                .values_list('author_id', flat=True)),
+            {other.pk}
+        )
+
+    def test_profile_shows_counters_without_count_queries(self):
+        Post.objects.create(text='Пост', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.reader_client.get(
+            reverse('posts:profile', args=[self.author.username])
+        )
+        stats = response.context['stats']
+        self.assertEqual(
+            (stats.posts_count, stats.followers_count, stats.following_count),
+            (1, 1, 0)
+        )
+
+    def test_rebuild_counters_command(self):
+        """Команда чинит счетчики, разошедшиеся с данными."""
+        Post.objects.bulk_create(
+            [Post(text=f'Пост {i}', author=self.author) for i in range(3)]
+        )
+        UserStats.objects.filter(user=self.reader).delete()
+        call_command('rebuild_counters', chunk_size=1, stdout=StringIO())
+        self.assertEqual(self.get_stats(self.author).posts_count, 3)
+        self.assertEqual(self.get_stats(self.reader).posts_count, 0)
@@ -0,0 +1,108 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import fanin
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+@override_settings(FOLLOW_FEED_ENGINE='fanin', RECENT_POSTS_BUFFER=4)
+class FanInFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Читатель')
+        cls.first = User.objects.create_user(username='Первый')
+        cls.second = User.objects.create_user(username='Второй')
+        Follow.objects.create(user=cls.reader, author=cls.first)
+        Follow.objects.create(user=cls.reader, author=cls.second)
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}',
+                author=cls.first if i % 2 else cls.second
+            )
+            for i in range(6)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def get_texts(self, url, **params):
+        response = self.reader_client.get(url, params)
+        page_obj = response.context['page_obj']
+        return [post.text for post in page_obj], page_obj
+
+    def test_feed_merges_author_buffers(self):
+        """Посты разных авторов сливаются в порядке публикации."""
+        with self.settings(POST_LMT=4):
+            texts, page_obj = self.get_texts(reverse('posts:follow_index'))
+        self.assertEqual(texts, ['Пост 5', 'Пост 4', 'Пост 3', 'Пост 2'])
+        self.assertIsNotNone(cache.get(fanin.buffer_key(self.first.pk)))
+
+    def test_feed_falls_back_to_database_past_buffers(self):
+        """За горизонтом неполных буферов лента читается из базы."""
+        url = reverse('posts:follow_index')
+        pages = []
+        with self.settings(RECENT_POSTS_BUFFER=2, POST_LMT=2):
+            texts, page_obj = self.get_texts(url)
+            pages.append(texts)
+            while page_obj.next_cursor:
+                texts, page_obj = self.get_texts(
+                    url, after=page_obj.next_cursor
+                )
+                pages.append(texts)
+        self.assertEqual(
+            pages,
+            [['Пост 5', 'Пост 4'], ['Пост 3', 'Пост 2'], ['Пост 1', 'Пост 0']]
+        )
+
+    def test_new_post_invalidates_buffer(self):
+        """Новый пост сбрасывает буфер автора, а не дописывается в него."""
+        self.get_texts(reverse('posts:follow_index'))
+        Post.objects.create(text='Новый пост', author=self.first)
+        self.assertIsNone(cache.get(fanin.buffer_key(self.first.pk)))
+        self.assertIsNotNone(cache.get(fanin.buffer_key(self.second.pk)))
+        texts, page_obj = self.get_texts(reverse('posts:follow_index'))
+        self.assertEqual(texts[0], 'Новый пост')
+        buffer = cache.get(fanin.buffer_key(self.first.pk))
+        self.assertEqual(buffer['items'][0][1], Post.objects.latest('id').pk)
+
+    def test_profile_first_page_is_served_from_buffer(self):
+        """Первая страница профиля — это буфер и один in_bulk."""
+        fanin.load_buffers([self.first.pk])
+        paginator = fanin.FanInPaginator(
+            self.first.posts.all(), 10, [self.first.pk]
+        )
+        with self.assertNumQueries(1):
+            page_obj = paginator.get_page()
+        self.assertEqual(
+            [post.text for post in page_obj], ['Пост 5', 'Пост 3', 'Пост 1']
+        )
+
+    def test_deleted_post_invalidates_buffer(self):
+        url = reverse('posts:profile', args=[self.first.username])
+        self.get_texts(url)
+        self.posts[5].delete()
+        texts, page_obj = self.get_texts(url)
+        self.assertEqual(texts, ['Пост 3', 'Пост 1'])
+
+    def test_buffer_built_before_new_post_is_not_kept(self):
+        """Буфер, собранный до параллельной публикации, не читается."""
+        build_buffer = fanin.build_buffer
+
+        def build_then_publish(author_id):
+            buffer = build_buffer(author_id)
+            Post.objects.create(text='Параллельный пост', author=self.first)
+            return buffer
+
+        with mock.patch.object(fanin, 'build_buffer', build_then_publish):
+            fanin.load_buffers([self.first.pk])
+        buffer = fanin.load_buffers([self.first.pk])[self.first.pk]
+        self.assertEqual(buffer['items'][0][1], Post.objects.latest('id').pk)
@@ -1,4 +1,5 @@
 # yatube/posts/tests/test_forms.py
+import hashlib
 import shutil
 import tempfile
 
@@ -170,6 +171,9 @@ class PostCreateFormTest(TestCase):
             ),
             content_type='image/gif'
         )
+        # Имя файла в хранилище — хэш его содержимого.
+        digest = hashlib.sha256(new_image.read()).hexdigest()
+        new_image.seek(0)
         data = {
             'text': 'С изменением картинки',
             'image': new_image
@@ -182,7 +186,7 @@ class PostCreateFormTest(TestCase):
         self.assertTrue(
             Post.objects.filter(
                 text='С изменением картинки',
-                image='posts/new_small.gif'
+                image=f'posts/{digest[:2]}/{digest[2:4]}/{digest}.gif'
             ).exists()
         )
 
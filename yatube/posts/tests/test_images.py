@@ -0,0 +1,88 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from posts import images
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+ORIENTATION = 0x0112
+
+
+def camera_jpeg():
+    """Снимок 40x20 с EXIF: камера повернута, картинку надо повернуть."""
+    exif = Image.Exif()
+    exif[ORIENTATION] = 6
+    output = BytesIO()
+    Image.new('RGB', (40, 20), 'red').save(
+        output, format='JPEG', exif=exif.tobytes()
+    )
+    return output.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_MAX_SIZE=30)
+class NormalizeImageTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Автор')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, data):
+        post = Post(text='Пост', author=self.author)
+        post.image.save('photo.jpg', ContentFile(data))
+        return post
+
+    def test_camera_photo_is_rotated_stripped_and_shrunk(self):
+        post = self.create_post(camera_jpeg())
+        original = post.image.name
+        name = images.normalize(post.pk, original)
+        self.assertNotEqual(name, original)
+        self.assertEqual(Post.objects.get(pk=post.pk).image.name, name)
+        storage = images.get_storage()
+        with storage.open(name) as saved:
+            image = Image.open(saved)
+            self.assertEqual(image.size, (15, 30))
+            self.assertFalse(image.getexif())
+        # Оригинал удаляет только сборщик сирот, когда он достаточно стар.
+        self.assertTrue(storage.exists(original))
+        call_command('delete_orphan_images', stdout=StringIO())
+        self.assertTrue(storage.exists(original))
+        call_command('delete_orphan_images', min_age=0, stdout=StringIO())
+        self.assertFalse(storage.exists(original))
+        self.assertTrue(storage.exists(name))
+
+    def test_shared_original_is_kept(self):
+        """Оригинал, на который ссылается другой пост, не удаляется."""
+        data = camera_jpeg()
+        post = self.create_post(data)
+        other = self.create_post(data)
+        self.assertEqual(post.image.name, other.image.name)
+        images.normalize(post.pk, post.image.name)
+        call_command('delete_orphan_images', min_age=0, stdout=StringIO())
+        self.assertTrue(images.get_storage().exists(other.image.name))
+
+    def test_quality_is_read_at_call_time(self):
+        with self.settings(IMAGE_QUALITY=42):
+            self.assertEqual(images.save_options('JPEG')['quality'], 42)
+            self.assertEqual(images.save_options('WEBP')['quality'], 42)
+
+    def test_clean_image_is_left_as_is(self):
+        output = BytesIO()
+        Image.new('RGB', (20, 10)).save(output, format='JPEG')
+        post = self.create_post(output.getvalue())
+        self.assertEqual(
+            images.normalize(post.pk, post.image.name), post.image.name
+        )
@@ -0,0 +1,141 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.paginators import CursorPaginator
+
+User = get_user_model()
+
+USERS = 50
+GROUPS = 10
+POSTS = 5000
+
+
+@skipUnless(connection.vendor == 'sqlite', 'План запроса в формате SQLite')
+class FeedQueryPlanTest(TestCase):
+    """Главные запросы лент идут по индексу и без сортировки в памяти."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(username=f'user{i}') for i in range(USERS)
+        )
+        cls.users = list(User.objects.all())
+        Group.objects.bulk_create(
+            Group(title=f'Группа {i}', slug=f'group{i}', description='')
+            for i in range(GROUPS)
+        )
+        cls.groups = list(Group.objects.all())
+        Post.objects.bulk_create(
+            (
+                Post(
+                    text=f'Пост {i}',
+                    author=cls.users[i % USERS],
+                    group=cls.groups[i % GROUPS] if i % 3 else None
+                )
+                for i in range(POSTS)
+            ),
+            batch_size=500
+        )
+        cls.post = Post.objects.first()
+        posts = list(Post.objects.all()[:200])
+        Comment.objects.bulk_create(
+            Comment(post=post, author=cls.users[i % USERS], text='Текст')
+            for i, post in enumerate(posts * 5)
+        )
+        Follow.objects.bulk_create(
+            Follow(user=user, author=author)
+            for user in cls.users[:10]
+            for author in cls.users[10:30]
+        )
+        TimelineEntry.objects.bulk_create(
+            TimelineEntry(
+                user=cls.users[i % 10], post=post, author_id=post.author_id,
+                pub_date=post.pub_date
+            )
+            for i, post in enumerate(Post.objects.all()[:2000])
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.anchor = (timezone.now(), POSTS // 2)
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def feed_queries(self, queryset, **kwargs):
+        """Первая и следующая страницы так, как их читает пагинатор."""
+        paginator = CursorPaginator(queryset, 10, **kwargs)
+        ordering = paginator.ordering(True)
+        return [
+            queryset.order_by(*ordering)[:11],
+            queryset.filter(paginator.keyset_filter(self.anchor, True))
+            .order_by(*ordering)[:11],
+        ]
+
+    def assert_indexed(self, queryset, index):
+        plan = self.explain(queryset)
+        self.assertFalse(
+            [step for step in plan if 'TEMP B-TREE' in step], plan
+        )
+        self.assertTrue([step for step in plan if index in step], plan)
+
+    def test_feed_queries_use_indexes(self):
+        user = self.users[0]
+        cases = {
+            'posts_post_date_idx': self.feed_queries(
+                Post.objects.select_related('author', 'group')
+            ),
+            'posts_post_group_date_idx': self.feed_queries(
+                self.groups[0].posts.select_related('author')
+            ),
+            'posts_post_author_date_idx': self.feed_queries(
+                user.posts.select_related('group')
+            ),
+            'posts_timeline_user_date_idx': self.feed_queries(
+                TimelineEntry.objects.filter(user=user), pk_field='post_id'
+            ),
+        }
+        for index, querysets in cases.items():
+            for queryset in querysets:
+                with self.subTest(index=index, sql=str(queryset.query)):
+                    self.assert_indexed(queryset, index)
+
+    def test_comment_queries_use_index(self):
+        queryset = Comment.objects.filter(post=self.post).select_related(
+            'author'
+        )
+        for descending in (True, False):
+            paginator = CursorPaginator(queryset, 10, descending=descending)
+            with self.subTest(descending=descending):
+                self.assert_indexed(
+                    queryset.order_by(*paginator.ordering(descending))[:11],
+                    'posts_comment_post_date_idx'
+                )
+
+    def test_follow_lookups_use_covering_indexes(self):
+        user = self.users[0]
+        author = self.users[10]
+        # Уникальное ограничение пары SQLite держит в автоиндексе.
+        cases = {
+            'sqlite_autoindex_posts_follow': Follow.objects.filter(
+                user=user
+            ).values_list('author_id', flat=True),
+            'posts_follow_author_user_idx': Follow.objects.filter(
+                author=author
+            ).values_list('user_id', flat=True),
+        }
+        for index, queryset in cases.items():
+            with self.subTest(index=index):
+                plan = self.explain(queryset)
+                self.assertTrue(
+                    [step for step in plan
+                     if f'COVERING INDEX {index}' in step],
+                    plan
+                )
@@ -1,9 +1,14 @@
 # yatube/tests/test_paginator.py
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
-from posts.models import Post, Group
+from posts.models import Comment, Post, Group
+from posts.paginators import CachedCountPaginator, encode_cursor
 
 User = get_user_model()
 
@@ -28,6 +33,9 @@ class ViewsPaginatorTest(TestCase):
         Post.objects.bulk_create(cls.posts)
 
     def setUp(self):
+        # bulk_create не шлет сигналов, поэтому закэшированные страницы
+        # прошлых тестов сбрасываем вручную.
+        cache.clear()
         self.guest_client = Client()
         self.user = User.objects.create_user(username='User1')
 
@@ -52,5 +60,161 @@ class ViewsPaginatorTest(TestCase):
         }
         POST_CNT_DIFF = 3
         for test_url in urls_names:
-            response = self.guest_client.get(test_url + '?page=2')
+            first_page = self.guest_client.get(test_url).context['page_obj']
+            response = self.guest_client.get(
+                test_url, {'after': first_page.next_cursor}
+            )
             self.assertEqual(len(response.context['page_obj']), POST_CNT_DIFF)
+
+    def test_previous_page_returns_first_records(self):
+        url = reverse('posts:index')
+        first_page = self.guest_client.get(url).context['page_obj']
+        second_page = self.guest_client.get(
+            url, {'after': first_page.next_cursor}
+        ).context['page_obj']
+        self.assertTrue(second_page.has_previous())
+        self.assertFalse(second_page.has_next())
+        response = self.guest_client.get(
+            url, {'before': second_page.previous_cursor}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']), list(first_page)
+        )
+
+    def test_new_posts_do_not_shift_next_page(self):
+        url = reverse('posts:index')
+        first_page = self.guest_client.get(url).context['page_obj']
+        Post.objects.create(text='Свежий пост', author=self.author)
+        response = self.guest_client.get(
+            url, {'after': first_page.next_cursor}
+        )
+        self.assertEqual(
+            [post.text for post in response.context['page_obj']],
+            [post.text for post in self.posts[2::-1]]
+        )
+
+    def test_broken_cursor_returns_first_page(self):
+        huge = encode_cursor(timezone.now(), 10 ** 30)
+        for token in ('испорчен', huge):
+            with self.subTest(token=token):
+                response = self.guest_client.get(
+                    reverse('posts:index'), {'after': token}
+                )
+                page_obj = response.context['page_obj']
+                self.assertFalse(page_obj.has_previous())
+                self.assertEqual(len(page_obj), 10)
+
+
+class CachedCountPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Unit1')
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый пост {i}', author=cls.author)
+            for i in range(25)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_is_cached(self):
+        CachedCountPaginator(Post.objects.all(), 10).count
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                CachedCountPaginator(Post.objects.all(), 10).count, 25
+            )
+
+    def test_page_window(self):
+        paginator = CachedCountPaginator(list(range(1000)), 10)
+        self.assertEqual(
+            paginator.page_window(50), [1, None, 48, 49, 50, 51, 52, None, 100]
+        )
+        self.assertEqual(paginator.page_window(1), [1, 2, 3, None, 100])
+        self.assertEqual(
+            CachedCountPaginator(list(range(30)), 10).page_window(2),
+            [1, 2, 3]
+        )
+
+    @override_settings(POST_PAGINATION='pages')
+    def test_numbered_pages_render_window(self):
+        response = Client().get(reverse('posts:index'), {'page': 2})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 10)
+        self.assertEqual(page_obj.window, [1, 2, 3])
+        self.assertContains(response, '?page=3')
+
+
+@override_settings(COMMENT_LMT=5)
+class CommentsPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Unit1')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        cls.other = Post.objects.create(text='Другой пост', author=cls.author)
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.author, text=f'Комментарий {i}')
+            for i in range(7)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_comments_are_paginated_newest_first(self):
+        """Под постом первые пять комментариев, остальные подгружаются."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.id])
+        )
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in comments],
+            [f'Комментарий {i}' for i in range(6, 1, -1)]
+        )
+        more = self.client.get(
+            reverse('posts:post_comments', args=[self.post.id]),
+            {'after': comments.next_cursor}
+        )
+        self.assertEqual(
+            [comment.text for comment in more.context['comments']],
+            ['Комментарий 1', 'Комментарий 0']
+        )
+        self.assertIsNone(more.context['comments'].next_cursor)
+
+    def test_more_link_works_without_js(self):
+        """"Показать еще" ведет на страницу поста, а не на голый фрагмент."""
+        url = reverse('posts:post_detail', args=[self.post.id])
+        response = self.client.get(url)
+        cursor = response.context['comments'].next_cursor
+        self.assertContains(
+            response, f'href="{url}?order=new&after={cursor}#comments"'
+        )
+        more = self.client.get(url, {'after': cursor})
+        self.assertTemplateUsed(more, 'posts/post_detail.html')
+        self.assertEqual(
+            [comment.text for comment in more.context['comments']],
+            ['Комментарий 1', 'Комментарий 0']
+        )
+
+    def test_oldest_first_order(self):
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.id]),
+            {'order': 'old'}
+        )
+        self.assertEqual(
+            response.context['comments'][0].text, 'Комментарий 0'
+        )
+
+    def test_query_count_does_not_depend_on_comments(self):
+        """Число запросов post_detail не растет вместе с комментариями."""
+        def count_queries(post):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse('posts:post_detail', args=[post.id]))
+            return len(queries)
+
+        Comment.objects.create(
+            post=self.other, author=self.author, text='Комментарий'
+        )
+        self.assertEqual(count_queries(self.post), count_queries(self.other))
@@ -0,0 +1,122 @@
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import search
+from posts.management.commands import rebuild_search_index
+from posts.models import Post
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Индекс FTS5 есть только в SQLite')
+class PostSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Автор')
+        cls.hedgehog = Post.objects.create(
+            text='Ёжик в тумане <b>искал</b> лошадку', author=cls.author
+        )
+        cls.hedgehogs = Post.objects.create(
+            text='Ежики ежики ежики бегают по лесу', author=cls.author
+        )
+        cls.cats = Post.objects.create(text='Кошки спят', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def found(self, query):
+        paginator = search.SearchPaginator(query, 10)
+        return list(paginator.get_page())
+
+    def test_word_forms_and_yo_are_matched(self):
+        """«ежиками» находит и «Ёжик», и «Ежики»."""
+        self.assertEqual(
+            {post.pk for post in self.found('ежиками')},
+            {self.hedgehog.pk, self.hedgehogs.pk}
+        )
+        self.assertEqual(self.found('туман'), [self.hedgehog])
+        self.assertEqual(self.found('!!!'), [])
+
+    def test_results_are_ranked_by_relevance(self):
+        self.assertEqual(self.found('ежики')[0], self.hedgehogs)
+
+    def test_snippet_is_highlighted_and_escaped(self):
+        post = self.found('лошадку')[0]
+        self.assertIn('<mark>лошадку</mark>', post.snippet)
+        self.assertIn('&lt;b&gt;', post.snippet)
+
+    def test_index_follows_edits_and_deletes(self):
+        post = Post.objects.get(pk=self.cats.pk)
+        post.text = 'Собаки лают'
+        post.save()
+        self.assertEqual(self.found('кошки'), [])
+        self.assertEqual(self.found('собаки'), [post])
+        post.delete()
+        self.assertEqual(self.found('собаки'), [])
+
+    @override_settings(POST_LMT=1)
+    def test_search_view_paginates_by_cursor(self):
+        url = reverse('posts:search')
+        response = self.client.get(url, {'q': 'ежик'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(list(page_obj), [self.hedgehogs])
+        self.assertContains(response, f'after={page_obj.next_cursor}')
+        response = self.client.get(
+            url, {'q': 'ежик', 'after': page_obj.next_cursor}
+        )
+        self.assertEqual(list(response.context['page_obj']), [self.hedgehog])
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'ежиками'}
+        )
+        self.assertEqual(
+            set(response.context['cl'].result_list),
+            {self.hedgehog, self.hedgehogs}
+        )
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {search.TABLE} ({search.TABLE}) "
+                "VALUES ('delete-all')"
+            )
+        self.assertEqual(self.found('кошки'), [])
+        out = StringIO()
+        call_command(
+            'rebuild_search_index', workers=1, chunk_size=2, stdout=out
+        )
+        self.assertEqual(self.found('кошки'), [self.cats])
+        self.assertIn('3', out.getvalue())
+
+    def test_failed_rebuild_keeps_old_index(self):
+        """Индекс перестраивается одной транзакцией: сбой не опустошает его."""
+        read_chunk = rebuild_search_index.read_chunk
+        calls = []
+
+        def fail_on_second_chunk(ids):
+            calls.append(ids)
+            if len(calls) > 1:
+                raise RuntimeError
+            return read_chunk(ids)
+
+        with mock.patch.object(
+            rebuild_search_index, 'read_chunk', fail_on_second_chunk
+        ), self.assertRaises(RuntimeError):
+            call_command(
+                'rebuild_search_index', workers=1, chunk_size=2,
+                stdout=StringIO()
+            )
+        self.assertEqual(self.found('кошки'), [self.cats])
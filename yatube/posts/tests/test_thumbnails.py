@@ -0,0 +1,131 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+
+from posts import thumbnails
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+image_gif = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ReadyThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Автор')
+        cls.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=cls.author,
+            image=SimpleUploadedFile(
+                name='small.gif', content=image_gif, content_type='image/gif'
+            )
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.thumbnail = thumbnails.backend.thumbnail_file(
+            self.post.image, '960x339', crop='center', upscale=True
+        )
+        default.kvstore.delete(self.thumbnail)
+
+    def test_page_shows_original_without_resizing(self):
+        """Пока миниатюры нет, страница показывает оригинал и не режет."""
+        original = f'src="{self.post.image.url}"'
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        ):
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), original)
+        self.assertIsNone(thumbnails.get_ready(self.post.image, 'card'))
+
+    def test_processed_image_gets_ready_thumbnails(self):
+        """После нарезки страница показывает миниатюры, а не оригинал."""
+        output = BytesIO()
+        Image.new('RGB', (40, 20), 'red').save(output, format='JPEG')
+        post = Post.objects.create(
+            text='Снимок',
+            author=self.author,
+            image=SimpleUploadedFile('photo.jpg', output.getvalue())
+        )
+        self.assertIsNone(thumbnails.get_ready(post.image, 'card'))
+        thumbnails.process(post.pk, post.image.name)
+        post = Post.objects.get(pk=post.pk)
+        picture = thumbnails.get_ready(post.image, 'card')
+        self.assertIsNotNone(picture)
+        self.assertIn(' 960w', picture.srcset)
+        self.assertIn(' 320w', picture.srcset)
+        [(mime_type, srcset)] = picture.sources
+        self.assertEqual(mime_type, 'image/webp')
+        self.assertIn('.webp 320w', srcset)
+        self.assertFalse(thumbnails.find_incomplete([post.image]))
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, picture.url)
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertNotContains(response, f'src="{post.image.url}"')
+
+    def test_page_thumbnails_are_fetched_in_one_query(self):
+        """Миниатюры всей страницы читаются одним запросом, затем из кэша."""
+        Post.objects.bulk_create(
+            Post(text='Пост', author=self.author, image=f'posts/{i}.gif')
+            for i in range(10)
+        )
+        posts = list(Post.objects.all())
+        with CaptureQueriesContext(connection) as queries:
+            thumbnails.attach(posts)
+        self.assertEqual(len(queries), 1)
+        with CaptureQueriesContext(connection) as queries:
+            thumbnails.attach(posts)
+        self.assertEqual(len(queries), 0)
+        self.assertTrue(all(post.thumbnail is None for post in posts))
+
+    def test_any_save_with_new_image_schedules_thumbnails(self):
+        """Картинка из админки или ORM режется так же, как с сайта."""
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            post = Post.objects.create(
+                text='Из ORM', author=self.author, image='posts/orm.gif'
+            )
+            schedule.assert_called_once_with(post)
+            post.text = 'Правка текста'
+            post.save()
+            Post.objects.create(text='Без картинки', author=self.author)
+            schedule.assert_called_once()
+            post = Post.objects.get(pk=post.pk)
+            post.image = 'posts/other.gif'
+            post.save()
+            self.assertEqual(schedule.call_count, 2)
+
+    def test_command_generates_missing_thumbnails(self):
+        with mock.patch.object(thumbnails, 'process') as process:
+            call_command('generate_thumbnails', stdout=StringIO())
+        process.assert_called_once_with(self.post.pk, self.post.image.name)
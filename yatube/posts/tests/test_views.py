@@ -205,6 +205,17 @@ class ViewsPagesTests(TestCase):
         )
         self.assertEqual(Follow.objects.count(), follower_cnt + 1)
 
+    def test_repeated_following_is_idempotent(self):
+        """Повторная подписка не создает второй строки и не ломает счетчик."""
+        url = reverse('posts:profile_follow', args=[ViewsPagesTests.user])
+        for _ in range(2):
+            response = self.authorized_client.post(url)
+            self.assertEqual(response.status_code, 302)
+        author = ViewsPagesTests.user
+        self.assertEqual(Follow.objects.filter(author=author).count(), 1)
+        author.stats.refresh_from_db()
+        self.assertEqual(author.stats.followers_count, 1)
+
     def test_unfollowing(self):
         self.authorized_client.post(
             reverse('posts:profile_follow', args=[ViewsPagesTests.user])
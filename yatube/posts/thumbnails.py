@@ -0,0 +1,262 @@
+"""
+Миниатюры картинок постов, нарезанные заранее.
+
+При любом сохранении поста с новой картинкой (сайт, админка, ORM) сигнал
+после коммита ставит в пул потоков обработку оригинала (posts.images) и
+нарезку всех размеров из settings.POST_THUMBNAILS; картинки, у которых
+миниатюр нет, дорезает команда generate_thumbnails. Вьюхи берут только
+готовые миниатюры из хранилища ключей sorl-thumbnail, сразу для всей
+страницы, а шаблон, пока миниатюры нет, показывает оригинал, так что
+запрос страницы никогда не ресайзит картинку сам.
+Каждый размер нарезается в нескольких ширинах (THUMBNAIL_WIDTHS) и
+форматах (THUMBNAIL_FORMATS) для srcset и <picture>.
+Когда миниатюры готовы, сбрасывается тег поста, и закэшированные ленты
+перерисовываются уже с картинкой.
+"""
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core import cache_tags
+
+from . import changelog, conditional, images
+from .caching import post_tag
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+MIME_TYPES = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'GIF': 'image/gif',
+    'WEBP': 'image/webp',
+}
+# Миниатюра для <picture>: запасной src, его srcset и [(type, srcset)]
+# для <source> современных форматов.
+Picture = namedtuple('Picture', 'url srcset sources')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class ReadyThumbnailBackend(ThumbnailBackend):
+    """Ищет готовую миниатюру по тем же правилам, что и get_thumbnail."""
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+
+backend = ReadyThumbnailBackend()
+
+
+def fetch_raw(keys):
+    """Сырые значения хранилища ключей sorl за один get_many."""
+    kvstore = default.kvstore
+    if not isinstance(kvstore, cached_db_kvstore.KVStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    raw = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in raw]
+    if missing:
+        found = dict(
+            KVStoreModel.objects.filter(key__in=missing)
+            .values_list('key', 'value')
+        )
+        # Промахи тоже кэшируются, как в самом KVStore._get_raw.
+        stored = {key: found.get(key, EMPTY_VALUE) for key in missing}
+        kvstore.cache.set_many(stored, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        raw.update(stored)
+    return {
+        key: value for key, value in raw.items()
+        if value is not None and value != EMPTY_VALUE
+    }
+
+
+def variants(size):
+    """(ширина, формат, геометрия, опции) всех вариантов миниатюры size."""
+    geometry, options = settings.POST_THUMBNAILS[size]
+    width, height = (int(side) for side in geometry.split('x'))
+    for variant_width in settings.THUMBNAIL_WIDTHS:
+        if variant_width > width:
+            continue
+        variant_height = round(height * variant_width / width)
+        for image_format in settings.THUMBNAIL_FORMATS:
+            yield (
+                variant_width,
+                image_format,
+                f'{variant_width}x{variant_height}',
+                dict(options, format=image_format)
+            )
+
+
+def make_picture(ready):
+    """
+    Picture из готовых вариантов {(формат, ширина): ImageFile}.
+
+    Последний формат из THUMBNAIL_FORMATS идет в <img>, остальные —
+    в <source>, и браузер сам выбирает тот, что понимает.
+    """
+    srcsets = {}
+    for (image_format, width), thumbnail in sorted(
+        ready.items(), key=lambda item: item[0][1]
+    ):
+        srcsets.setdefault(image_format, []).append(
+            (thumbnail.url, width)
+        )
+    *modern, fallback = settings.THUMBNAIL_FORMATS
+    if fallback not in srcsets:
+        return None
+    return Picture(
+        url=srcsets[fallback][-1][0],
+        srcset=format_srcset(srcsets[fallback]),
+        sources=[
+            (MIME_TYPES[image_format], format_srcset(srcsets[image_format]))
+            for image_format in modern if image_format in srcsets
+        ]
+    )
+
+
+def format_srcset(candidates):
+    return ', '.join(f'{url} {width}w' for url, width in candidates)
+
+
+def get_ready_many(images, size):
+    """Готовые миниатюры картинок: {имя картинки: Picture}."""
+    keys = {}
+    for image in images:
+        if not image:
+            continue
+        for width, image_format, geometry, options in variants(size):
+            thumbnail = backend.thumbnail_file(image, geometry, **options)
+            keys[add_prefix(thumbnail.key)] = (image.name, image_format, width)
+    ready = {}
+    for key, value in fetch_raw(list(keys)).items():
+        name, image_format, width = keys[key]
+        ready.setdefault(name, {})[image_format, width] = (
+            deserialize_image_file(value)
+        )
+    pictures = {name: make_picture(found) for name, found in ready.items()}
+    return {
+        name: picture for name, picture in pictures.items() if picture
+    }
+
+
+def find_incomplete(images):
+    """Имена картинок, у которых нарезаны не все варианты всех размеров."""
+    keys = {}
+    for image in images:
+        if not image:
+            continue
+        for size in settings.POST_THUMBNAILS:
+            for _, _, geometry, options in variants(size):
+                thumbnail = backend.thumbnail_file(image, geometry, **options)
+                keys[add_prefix(thumbnail.key)] = image.name
+    found = fetch_raw(list(keys))
+    return {name for key, name in keys.items() if key not in found}
+
+
+def image_file(name):
+    """
+    Картинка поста по имени, как ее отдает поле image.
+
+    sorl хранит ключ источника вместе с хранилищем, поэтому резать и
+    искать миниатюры надо по файлу из хранилища поля, а не по голому
+    имени в хранилище по умолчанию.
+    """
+    field = Post._meta.get_field('image')
+    return field.attr_class(None, field, name)
+
+
+def get_ready_by_name(names, size):
+    """get_ready_many по именам файлов из .values(), без экземпляров Post."""
+    return get_ready_many([image_file(name) for name in names if name], size)
+
+
+def get_ready(image, size):
+    """Готовая миниатюра размера size из POST_THUMBNAILS или None."""
+    if not image:
+        return None
+    return get_ready_many([image], size).get(image.name)
+
+
+def attach(posts, size='card'):
+    """Кладет в post.thumbnail готовую миниатюру или None для каждого поста."""
+    posts = list(posts)
+    ready = get_ready_many([post.image for post in posts], size)
+    for post in posts:
+        post.thumbnail = ready.get(post.image.name) if post.image else None
+    return posts
+
+
+def generate(post_id, image_name):
+    image = image_file(image_name)
+    for size in settings.POST_THUMBNAILS:
+        for _, _, geometry, options in variants(size):
+            try:
+                default.backend.get_thumbnail(image, geometry, **options)
+            except Exception:
+                logger.exception(
+                    'Не удалось нарезать %s под %s', image_name, geometry
+                )
+    # Карточка поста меняется: заглушку сменяет картинка.
+    posts = Post.objects.filter(pk=post_id)
+    posts.update(updated_at=timezone.now())
+    conditional.touch_posts(posts)
+    changelog.post_updated(post_id)
+    cache_tags.invalidate(post_tag(post_id))
+
+
+def process(post_id, image_name):
+    """Обработка оригинала и нарезка миниатюр уже для нового файла."""
+    try:
+        image_name = images.normalize(post_id, image_name)
+        if image_name:
+            generate(post_id, image_name)
+    finally:
+        # У каждого потока пула свое соединение с базой.
+        if threading.current_thread() is not threading.main_thread():
+            connection.close()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                settings.THUMBNAIL_WORKERS, thread_name_prefix='thumbnails'
+            )
+    return _executor
+
+
+def schedule(post):
+    """Обрабатывает картинку поста и режет миниатюры после коммита."""
+    if not post.image:
+        return
+    args = (post.pk, post.image.name)
+    if settings.THUMBNAIL_WORKERS:
+        transaction.on_commit(lambda: get_executor().submit(process, *args))
+    else:
+        transaction.on_commit(lambda: process(*args))
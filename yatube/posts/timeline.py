@@ -0,0 +1,111 @@
+"""
+Материализованная домашняя лента подписчика.
+
+При публикации id поста раскладывается по лентам подписчиков автора,
+и follow_index читает одну ленту диапазоном по индексу
+(user, pub_date, post). Авторы, у которых подписчиков больше
+TIMELINE_FANOUT_LIMIT, в ленты не раскладываются: их посты
+подмешиваются при чтении.
+"""
+import heapq
+
+from django.conf import settings
+
+from .models import Follow, Post, TimelineEntry, UserStats
+from .paginators import CursorPaginator
+
+
+def push_post(post):
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    followers = list(
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)[:limit + 1]
+    )
+    if len(followers) > limit:
+        return
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post.pk,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for user_id in followers
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    if UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).exists():
+        return
+    recent = (
+        Post.objects.filter(author_id=author_id)
+        .order_by('-pub_date', '-id')
+        .values_list('id', 'pub_date')[:settings.TIMELINE_BACKFILL]
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, pub_date in recent
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+def remove(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def celebrity_ids(user):
+    """Авторы из подписок пользователя, которых читают при выдаче ленты."""
+    return list(
+        UserStats.objects.filter(
+            user__in=Follow.objects.filter(user=user).values('author'),
+            followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+        ).values_list('user_id', flat=True)
+    )
+
+
+class TimelinePaginator(CursorPaginator):
+    def __init__(self, user, per_page, posts=None):
+        super().__init__(TimelineEntry.objects.filter(user=user), per_page)
+        self.user = user
+        if posts is None:
+            posts = Post.objects.select_related('author', 'group')
+        self.posts = posts
+
+    def fetch(self, anchor, backwards, limit):
+        posts = self.posts
+        entries = CursorPaginator(
+            self.object_list, limit, pk_field='post_id'
+        ).fetch(anchor, backwards, limit)
+        bulk = posts.in_bulk([entry.post_id for entry in entries])
+        rows = [bulk[entry.post_id] for entry in entries
+                if entry.post_id in bulk]
+        celebrities = celebrity_ids(self.user)
+        if not celebrities:
+            return rows
+        merged = CursorPaginator(
+            posts.filter(author__in=celebrities), limit
+        ).fetch(anchor, backwards, limit)
+        descending = self.descending != backwards
+        result = []
+        seen = set()
+        for post in heapq.merge(rows, merged, key=self.get_key,
+                                reverse=descending):
+            if post.pk not in seen:
+                seen.add(post.pk)
+                result.append(post)
+        return result[:limit]
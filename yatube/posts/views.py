@@ -1,29 +1,116 @@
 # posts/views.py
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
 from django.http import HttpResponseRedirect
 from django.shortcuts import render, get_object_or_404, redirect
 from django.conf import settings
 
+from core import streaming
+from core.decorators import anonymous_page_cache
+
+from . import conditional, counters, search, thumbnails
+from .caching import FEED_INDEX, author_tag, group_tag, page_tags, post_tag
+from .conditional import conditional_page
 from .forms import CommentForm, PostForm
 from .models import Comment, Follow, Post, Group, User
+from .fanin import FanInPaginator
+from .paginators import CachedCountPaginator, CursorPaginator
+from .timeline import TimelinePaginator
 
 
-def get_page_context(queryset, request):
-    paginator = Paginator(queryset, settings.POST_LMT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+def get_cursor_page(paginator, request):
+    page_obj = paginator.get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    thumbnails.attach(page_obj)
     return {
         'page_obj': page_obj,
     }
 
 
+def get_page_context(queryset, request):
+    if settings.POST_PAGINATION == 'pages':
+        paginator = CachedCountPaginator(
+            queryset,
+            settings.POST_LMT,
+            count_timeout=settings.POST_COUNT_TIMEOUT
+        )
+        page_obj = paginator.get_page(request.GET.get('page'))
+        thumbnails.attach(page_obj)
+        return {
+            'page_obj': page_obj,
+        }
+    return get_cursor_page(
+        CursorPaginator(queryset, settings.POST_LMT),
+        request
+    )
+
+
+def get_comments_context(post, request):
+    order = 'old' if request.GET.get('order') == 'old' else 'new'
+    paginator = CursorPaginator(
+        Comment.objects.filter(post=post).select_related('author'),
+        settings.COMMENT_LMT,
+        descending=order == 'new'
+    )
+    return {
+        'comments': paginator.get_page(after=request.GET.get('after')),
+        'comments_order': order,
+    }
+
+
+def get_follow_paginator(user, posts=None):
+    """
+    Лента подписок из FOLLOW_FEED_ENGINE; posts — выборка, из которой
+    берутся посты страницы (по умолчанию с автором и группой).
+    """
+    if posts is None:
+        posts = Post.objects.select_related('author', 'group')
+    if settings.FOLLOW_FEED_ENGINE == 'fanin':
+        author_ids = list(
+            Follow.objects.filter(user=user)
+            .values_list('author_id', flat=True)
+        )
+        return FanInPaginator(
+            posts.filter(author_id__in=author_ids),
+            settings.POST_LMT,
+            author_ids
+        )
+    return TimelinePaginator(user, settings.POST_LMT, posts)
+
+
+def render_tagged(request, template, context):
+    response = render(request, template, context)
+    response.cache_tags = context['cache_tags']
+    return response
+
+
+def render_feed(request, template, context):
+    """
+    Лента: при FEED_STREAMING авторизованным — потоком (core.streaming).
+
+    Анонимные страницы все равно берутся из кэша страниц, а потоковый
+    ответ туда не попадает.
+    """
+    if settings.FEED_STREAMING and request.user.is_authenticated:
+        return streaming.render(request, template, context)
+    if 'cache_tags' in context:
+        return render_tagged(request, template, context)
+    return render(request, template, context)
+
+
+@anonymous_page_cache
+@conditional_page(conditional.index_state)
 def index(request):
     post_list = Post.objects.select_related('author', 'group')
     context = get_page_context(post_list, request)
-    return render(request, 'posts/index.html', context)
+    context['cache_tags'] = page_tags(context['page_obj'], FEED_INDEX)
+    return render_feed(request, 'posts/index.html', context)
 
 
+@anonymous_page_cache
+@conditional_page(conditional.group_state)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     context = {
@@ -31,36 +118,81 @@ def group_posts(request, slug):
     }
     context.update(get_page_context(group.posts.select_related('author'),
                                     request))
-    return render(request, 'posts/group_list.html', context)
+    context['cache_tags'] = page_tags(context['page_obj'], group_tag(slug))
+    return render_feed(request, 'posts/group_list.html', context)
 
 
+@anonymous_page_cache
+@conditional_page(conditional.profile_state)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username
+    )
     user = request.user
     follow = author.following.exists()
     following = user.is_authenticated and follow
     context = {
         'author': author,
+        'stats': counters.get_stats(author),
         'following': following,
     }
-    context.update(get_page_context(author.posts.select_related('group'),
-                                    request))
-    return render(request, 'posts/profile.html', context)
+    paginator = FanInPaginator(
+        author.posts.select_related('group'),
+        settings.POST_LMT,
+        [author.pk]
+    )
+    context.update(get_cursor_page(paginator, request))
+    context['cache_tags'] = page_tags(
+        context['page_obj'], author_tag(author.pk)
+    )
+    return render_feed(request, 'posts/profile.html', context)
 
 
+@anonymous_page_cache
+@conditional_page(conditional.post_state)
 def post_detail(request, post_id):
     post = get_object_or_404(
-        Post.objects.select_related('author', 'group'),
+        Post.objects.select_related('author__stats', 'group'),
         id=post_id
     )
+    thumbnails.attach([post])
     form = CommentForm()
-    comments = Comment.objects.filter(post=post)
     context = {
         'post': post,
-        'comments': comments,
+        'author_stats': counters.get_stats(post.author),
         'form': form,
+        'cache_tags': [post_tag(post.pk), author_tag(post.author_id)],
     }
-    return render(request, 'posts/post_detail.html', context)
+    context.update(get_comments_context(post, request))
+    if post.group:
+        context['cache_tags'].append(group_tag(post.group.slug))
+    return render_tagged(request, 'posts/post_detail.html', context)
+
+
+@anonymous_page_cache
+@conditional_page(conditional.post_state)
+def post_comments(request, post_id):
+    post = get_object_or_404(Post, id=post_id)
+    context = {
+        'post': post,
+        'cache_tags': [post_tag(post.pk)],
+    }
+    context.update(get_comments_context(post, request))
+    return render_tagged(request, 'posts/includes/comments.html', context)
+
+
+@anonymous_page_cache
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    context = {
+        'query': query,
+    }
+    context.update(get_cursor_page(
+        search.get_paginator(query, settings.POST_LMT), request
+    ))
+    context['cache_tags'] = page_tags(context['page_obj'], FEED_INDEX)
+    return render_tagged(request, 'posts/search.html', context)
 
 
 @login_required
@@ -72,7 +204,8 @@ def post_create(request):
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        with transaction.atomic():
+            post.save()
         return redirect('posts:profile', request.user)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -89,7 +222,8 @@ def post_edit(request, post_id):
         return redirect('posts:profile', request.user)
     else:
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                form.save()
             return redirect('posts:post_detail', post_id)
         else:
             context = {
@@ -107,16 +241,18 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
+@conditional_page(conditional.follow_state)
 def follow_index(request):
     template = 'posts/follow.html'
-    post_list = Post.objects.filter(author__following__user=request.user)
-    context = get_page_context(post_list, request)
-    return render(request, template, context)
+    paginator = get_follow_paginator(request.user)
+    context = get_cursor_page(paginator, request)
+    return render_feed(request, template, context)
 
 
 @login_required
@@ -124,7 +260,13 @@ def profile_follow(request, username):
     author = User.objects.get(username=username)
     user = request.user
     if author != user:
-        Follow.objects.get_or_create(author=author, user=user)
+        # Повторную подписку, в том числе от параллельного запроса,
+        # отсекает уникальный индекс пары, а не предварительный SELECT.
+        try:
+            with transaction.atomic():
+                Follow.objects.create(author=author, user=user)
+        except IntegrityError:
+            pass
         return redirect('posts:profile', username=username)
     return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
     # Если коротко, то юзер вернется на ту страницу, откуда он перешел сюда))
@@ -134,5 +276,8 @@ def profile_follow(request, username):
 @login_required
 def profile_unfollow(request, username):
     user = request.user
-    Follow.objects.filter(user=user, author__username=username).delete()
+    with transaction.atomic():
+        Follow.objects.filter(
+            user=user, author__username=username
+        ).delete()
     return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -49,6 +50,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -59,7 +61,58 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'yatube.urls'
 
+# Сжатие ответов gzip/br: типы, минимальный размер тела в байтах и
+# уровень (1–9; для brotli — качество).
+COMPRESS_CONTENT_TYPES = ('text/html', 'application/json')
+COMPRESS_MIN_SIZE: int = 512
+COMPRESS_LEVEL: int = 6
+
 POST_LMT: int = 10
+# Постраничный вывод главной и групп: 'cursor' — по ключу (pub_date, id),
+# 'pages' — нумерованные страницы с кэшированным COUNT(*).
+POST_PAGINATION = 'cursor'
+# Сколько секунд кэшируется COUNT(*) нумерованных страниц.
+POST_COUNT_TIMEOUT: int = 60
+# Сколько комментариев показывать под постом и подгружать за раз.
+COMMENT_LMT: int = 20
+# Отдавать ленты авторизованным пользователям потоком: <head> и шапка
+# уходят сразу, карточки — по мере рендера (см. core.streaming).
+FEED_STREAMING = False
+# Сколько постов, пользователей и групп вместе можно запросить через
+# /api/v1/batch/ за один раз.
+API_BATCH_LIMIT: int = 100
+# Сколько записей журнала изменений отдает /api/v1/sync/ за раз.
+SYNC_BATCH: int = 200
+
+# Размеры миниатюр картинок постов: имя -> (геометрия, опции sorl).
+# Все они нарезаются в фоне сразу после публикации или правки поста.
+POST_THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+# Ширины вариантов каждой миниатюры для srcset (не больше ее геометрии).
+THUMBNAIL_WIDTHS = (320, 640, 960)
+# Форматы вариантов: последний — запасной для <img>, остальные браузер
+# выбирает в <source> по поддержке. sorl-thumbnail умеет JPEG, PNG, GIF
+# и WEBP.
+THUMBNAIL_FORMATS = ('WEBP', 'JPEG')
+# Потоков для обработки картинок и нарезки миниатюр; 0 — сразу после
+# коммита.
+THUMBNAIL_WORKERS: int = 2
+# Загруженные картинки без EXIF, повернутые и не больше стольких пикселей
+# по длинной стороне.
+IMAGE_MAX_SIZE: int = 2560
+IMAGE_QUALITY: int = 85
+
+# Авторы, у которых подписчиков больше лимита, не раскладываются по лентам
+# подписчиков при публикации, а подмешиваются в follow_index при чтении.
+TIMELINE_FANOUT_LIMIT: int = 1000
+# Сколько последних постов автора попадает в ленту при подписке.
+TIMELINE_BACKFILL: int = 200
+# Движок follow_index: 'timeline' — материализованная лента,
+# 'fanin' — слияние буферов последних постов авторов.
+FOLLOW_FEED_ENGINE = 'timeline'
+# Размер буфера последних постов автора для 'fanin' и профиля.
+RECENT_POSTS_BUFFER: int = 50
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -137,11 +190,47 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+# Имена с хэшем содержимого и сжатые копии .gz/.br, см. core.storage.
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
 
 CSRF_FAILURE_VIEW = 'core.views.permission_denied'
 
+TEST_RUNNER = 'core.runner.TestRunner'
+
+# Кэш в файле SQLite общий для всех воркеров на хосте.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.sqlite_cache.SQLiteCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_PATH',
+            os.path.join(BASE_DIR, 'cache', 'cache.sqlite3')
+        ),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_SIZE': 256 * 1024 * 1024,
+            'COMPRESS_MIN_LENGTH': 1024,
+            'COMPRESS_LEVEL': 6,
+        },
+    },
+    # Память процесса перед общим кэшем: защита от лавинного пересчета
+    # и досрочное обновление горячих ключей.
+    'tiered': {
+        'BACKEND': 'core.tiered_cache.TieredCache',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'L2': 'default',
+            'L1_TIMEOUT': 5,
+            'L1_MAX_ENTRIES': 1000,
+            'BETA': 1.0,
+        },
+    },
 }
+
+# Кэш для значений с тегами: фрагменты шаблонов и страницы целиком.
+# Версии тегов всегда хранятся в 'default'.
+TAGGED_CACHE = 'tiered'
+
+# Сколько секунд живет страница, закэшированная для анонимных посетителей;
+# изменения контента сбрасывают ее раньше через теги.
+PAGE_CACHE_TIMEOUT: int = 60 * 60